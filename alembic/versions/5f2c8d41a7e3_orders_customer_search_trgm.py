@@ -0,0 +1,34 @@
+"""Trigram index for customer search
+
+Revision ID: 5f2c8d41a7e3
+Revises: b60da0b9f33a
+Create Date: 2026-10-18 10:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2c8d41a7e3'
+down_revision: Union[str, None] = 'b60da0b9f33a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY keeps orders writable while the index builds on a large table.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_customer_search_trgm ON orders "
+            "USING gin ((customer_name || ' ' || customer_email || ' ' || customer_street || ' ' "
+            "|| customer_city || ' ' || customer_postal_code) gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_orders_customer_search_trgm")
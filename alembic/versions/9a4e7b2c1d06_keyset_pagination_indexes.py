@@ -0,0 +1,46 @@
+"""Keyset pagination indexes
+
+Revision ID: 9a4e7b2c1d06
+Revises: 5f2c8d41a7e3
+Create Date: 2026-10-18 11:40:02.553190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e7b2c1d06'
+down_revision: Union[str, None] = '5f2c8d41a7e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset cursors compare (created_at, id), which breaks on NULL timestamps.
+    for table in ('meals', 'orders'):
+        op.execute(f"UPDATE {table} SET created_at = coalesce(updated_at, now()) WHERE created_at IS NULL")
+        op.alter_column(table, 'created_at', existing_type=sa.DateTime(), nullable=False)
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_meals_created_at_id', 'meals', ['created_at', 'id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_order_meals_meal_id_order_id', 'order_meals', ['meal_id', 'order_id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_order_meals_meal_id_order_id', table_name='order_meals',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_orders_created_at_id', table_name='orders',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_meals_created_at_id', table_name='meals',
+                      postgresql_concurrently=True, if_exists=True)
+
+    for table in ('orders', 'meals'):
+        op.alter_column(table, 'created_at', existing_type=sa.DateTime(), nullable=True)
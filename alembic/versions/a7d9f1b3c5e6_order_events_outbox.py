@@ -0,0 +1,40 @@
+"""Order events outbox
+
+Revision ID: a7d9f1b3c5e6
+Revises: f6c8e0a2b4d5
+Create Date: 2026-10-18 14:58:13.604219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d9f1b3c5e6'
+down_revision: Union[str, None] = 'f6c8e0a2b4d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('order_events',
+    sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('order_id', sa.UUID(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_order_events_pending', 'order_events', ['available_at', 'id'], unique=False,
+                    postgresql_where=sa.text('dispatched_at IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_order_events_pending', table_name='order_events', postgresql_where=sa.text('dispatched_at IS NULL'))
+    op.drop_table('order_events')
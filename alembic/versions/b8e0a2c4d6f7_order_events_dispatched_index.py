@@ -0,0 +1,33 @@
+"""Index dispatched order events for the outbox purge
+
+Revision ID: b8e0a2c4d6f7
+Revises: a7d9f1b3c5e6
+Create Date: 2026-10-18 18:12:37.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e0a2c4d6f7'
+down_revision: Union[str, None] = 'a7d9f1b3c5e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# purge_dispatched deletes events dispatched before the retention window; without
+# an index it reads the whole outbox, pending events included, on every run.
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_order_events_dispatched_at', 'order_events', ['dispatched_at'], unique=False,
+                        postgresql_where=sa.text('dispatched_at IS NOT NULL'), postgresql_concurrently=True,
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_order_events_dispatched_at', table_name='order_events',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,27 @@
+"""Meal image variants
+
+Revision ID: c31d5e8f9b47
+Revises: 9a4e7b2c1d06
+Create Date: 2026-10-18 14:05:31.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c31d5e8f9b47'
+down_revision: Union[str, None] = '9a4e7b2c1d06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('meals', sa.Column('image_variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('meals', 'image_variants')
@@ -0,0 +1,47 @@
+"""Shard meal_daily_stats
+
+Revision ID: c9f1b3d5e7a8
+Revises: b8e0a2c4d6f7
+Create Date: 2026-10-18 18:47:05.913264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f1b3d5e7a8'
+down_revision: Union[str, None] = 'b8e0a2c4d6f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows become shard 0; new orders spread over analytics_shards rows.
+    op.add_column('meal_daily_stats', sa.Column('shard', sa.SmallInteger(), nullable=False, server_default='0'))
+    op.alter_column('meal_daily_stats', 'shard', server_default=None)
+    op.drop_constraint('meal_daily_stats_pkey', 'meal_daily_stats', type_='primary')
+    op.create_primary_key('meal_daily_stats_pkey', 'meal_daily_stats', ['meal_id', 'day', 'shard'])
+
+
+def downgrade() -> None:
+    # Fold the other shards into shard 0 before the column goes.
+    op.execute("""
+        WITH moved AS (
+            DELETE FROM meal_daily_stats WHERE shard <> 0
+            RETURNING meal_id, day, order_count, quantity, revenue
+        )
+        INSERT INTO meal_daily_stats (meal_id, day, shard, order_count, quantity, revenue)
+        SELECT meal_id, day, 0, sum(order_count), sum(quantity), sum(revenue)
+        FROM moved
+        GROUP BY meal_id, day
+        ON CONFLICT (meal_id, day, shard) DO UPDATE
+        SET order_count = meal_daily_stats.order_count + excluded.order_count,
+            quantity = meal_daily_stats.quantity + excluded.quantity,
+            revenue = meal_daily_stats.revenue + excluded.revenue
+    """)
+    op.drop_constraint('meal_daily_stats_pkey', 'meal_daily_stats', type_='primary')
+    op.drop_column('meal_daily_stats', 'shard')
+    op.create_primary_key('meal_daily_stats_pkey', 'meal_daily_stats', ['meal_id', 'day'])
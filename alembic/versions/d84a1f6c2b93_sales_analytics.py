@@ -0,0 +1,64 @@
+"""Sales analytics aggregates
+
+Revision ID: d84a1f6c2b93
+Revises: c31d5e8f9b47
+Create Date: 2026-10-18 14:22:47.318506
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd84a1f6c2b93'
+down_revision: Union[str, None] = 'c31d5e8f9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('meal_daily_stats',
+    sa.Column('meal_id', sa.UUID(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['meal_id'], ['meals.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('meal_id', 'day')
+    )
+    op.create_index('ix_meal_daily_stats_day', 'meal_daily_stats', ['day'], unique=False)
+    op.create_table('daily_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('shard', sa.SmallInteger(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'shard')
+    )
+
+    # Backfill from existing orders. Revenue uses the current meal prices, the
+    # only prices stored so far.
+    op.execute("""
+        INSERT INTO meal_daily_stats (meal_id, day, order_count, quantity, revenue)
+        SELECT om.meal_id, o.created_at::date, count(*), sum(om.quantity), sum(om.quantity * m.price)
+        FROM order_meals om
+        JOIN orders o ON o.id = om.order_id
+        JOIN meals m ON m.id = om.meal_id
+        GROUP BY om.meal_id, o.created_at::date
+    """)
+    op.execute("""
+        INSERT INTO daily_sales (day, shard, order_count, quantity, revenue)
+        SELECT o.created_at::date, 0, count(DISTINCT o.id), sum(om.quantity), sum(om.quantity * m.price)
+        FROM orders o
+        JOIN order_meals om ON om.order_id = o.id
+        JOIN meals m ON m.id = om.meal_id
+        GROUP BY o.created_at::date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_sales')
+    op.drop_index('ix_meal_daily_stats_day', table_name='meal_daily_stats')
+    op.drop_table('meal_daily_stats')
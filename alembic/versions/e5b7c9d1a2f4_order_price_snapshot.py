@@ -0,0 +1,54 @@
+"""Snapshot meal name and price on order lines, store order totals
+
+Revision ID: e5b7c9d1a2f4
+Revises: d84a1f6c2b93
+Create Date: 2026-10-18 14:31:09.662043
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7c9d1a2f4'
+down_revision: Union[str, None] = 'd84a1f6c2b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('order_meals', sa.Column('unit_price', sa.Numeric(precision=10, scale=2), nullable=True))
+    op.add_column('order_meals', sa.Column('meal_name', sa.String(), nullable=True))
+    op.add_column('orders', sa.Column('total', sa.Numeric(precision=12, scale=2), nullable=True))
+
+    # Existing lines get the current meal name and price: the prices they were
+    # ordered at were never stored.
+    op.execute("""
+        UPDATE order_meals om
+        SET unit_price = m.price, meal_name = m.name
+        FROM meals m
+        WHERE m.id = om.meal_id
+    """)
+    op.execute("""
+        UPDATE orders o
+        SET total = lines.total
+        FROM (
+            SELECT order_id, sum(unit_price * quantity) AS total
+            FROM order_meals
+            GROUP BY order_id
+        ) lines
+        WHERE lines.order_id = o.id
+    """)
+    op.execute("UPDATE orders SET total = 0 WHERE total IS NULL")
+
+    op.alter_column('order_meals', 'unit_price', nullable=False)
+    op.alter_column('order_meals', 'meal_name', nullable=False)
+    op.alter_column('orders', 'total', nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('orders', 'total')
+    op.drop_column('order_meals', 'meal_name')
+    op.drop_column('order_meals', 'unit_price')
@@ -0,0 +1,38 @@
+"""Index audit: drop indexes that duplicate primary keys
+
+Revision ID: f6c8e0a2b4d5
+Revises: e5b7c9d1a2f4
+Create Date: 2026-10-18 14:40:52.117380
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c8e0a2b4d5'
+down_revision: Union[str, None] = 'e5b7c9d1a2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Audit of every foreign key and sort order used by the repository queries:
+#   order_meals.order_id      -> order_meals_pkey (order_id, meal_id)
+#   order_meals.meal_id       -> ix_order_meals_meal_id_order_id (9a4e7b2c1d06)
+#   meal_daily_stats.meal_id  -> meal_daily_stats_pkey (meal_id, day)
+#   orders/meals (created_at, id) keysets -> ix_orders_created_at_id, ix_meals_created_at_id (9a4e7b2c1d06)
+# ix_meals_id and ix_orders_id repeat the primary key indexes: they cost a write
+# on every insert and are never chosen by the planner.
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_meals_id', table_name='meals', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_orders_id', table_name='orders', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_orders_id', 'orders', ['id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_meals_id', 'meals', ['id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
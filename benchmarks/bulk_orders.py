@@ -0,0 +1,58 @@
+"""Order ingestion throughput: single POST /api/orders vs POST /api/orders/bulk.
+
+    python -m benchmarks.bulk_orders --base-url http://localhost:8000 --orders 5000 --batch 1000
+
+Needs a running app with some meals (``python -m benchmarks.seed --orders 0``).
+"""
+import argparse
+import asyncio
+import random
+
+import httpx
+
+from benchmarks.common import print_summary, run_load
+
+
+def make_order(number: int, meal_ids: list[str]) -> dict:
+    return {
+        "customer": {
+            "name": f"Bulk Customer {number}",
+            "email": f"bulk{number}@example.com",
+            "street": f"{number % 300} Main Street",
+            "city": "Kyiv",
+            "postal-code": f"{number % 99999:05d}",
+        },
+        "items": [{"id": meal_id, "quantity": random.randint(1, 3)}
+                  for meal_id in random.sample(meal_ids, k=min(len(meal_ids), random.randint(1, 3)))],
+    }
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.base_url) as client:
+        meal_ids = [meal["id"] for meal in (await client.get("/api/meals/", params={"limit": 200})).json()]
+    if not meal_ids:
+        raise SystemExit("No meals found; seed some first.")
+
+    single = await run_load("single", lambda client, number: client.post("/api/orders/", json=make_order(number, meal_ids)),
+                            args.base_url, args.orders, args.concurrency)
+    summary = single.summary()
+    summary["orders_per_s"] = round(args.orders / single.elapsed, 1)
+    print_summary(summary)
+
+    batches = max(1, args.orders // args.batch)
+    bulk = await run_load("bulk", lambda client, number: client.post(
+                              "/api/orders/bulk", json=[make_order(number * args.batch + offset, meal_ids)
+                                                        for offset in range(args.batch)]),
+                          args.base_url, batches, min(args.concurrency, batches))
+    summary = bulk.summary()
+    summary["orders_per_s"] = round(batches * args.batch / bulk.elapsed, 1)
+    print_summary(summary)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+from sqlalchemy import event
+
+
+@dataclass
+class LoadResult:
+    scenario: str
+    requests: int
+    concurrency: int
+    errors: int
+    elapsed: float
+    latencies: list[float] = field(default_factory=list, repr=False)
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> dict:
+        return {
+            "scenario": self.scenario,
+            "requests": self.requests,
+            "concurrency": self.concurrency,
+            "errors": self.errors,
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_rps": round(self.throughput, 1),
+            "mean_ms": round(statistics.fmean(self.latencies) * 1000, 2) if self.latencies else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+        }
+
+
+async def run_load(scenario: str,
+                   make_request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+                   base_url: str,
+                   requests: int,
+                   concurrency: int) -> LoadResult:
+    """Fire ``requests`` calls with at most ``concurrency`` in flight and collect latencies."""
+    result = LoadResult(scenario=scenario, requests=requests, concurrency=concurrency, errors=0, elapsed=0.0)
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            for number in counter:
+                started = time.perf_counter()
+                try:
+                    response = await make_request(client, number)
+                    if response.status_code >= 400:
+                        result.errors += 1
+                except httpx.HTTPError:
+                    result.errors += 1
+                result.latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        result.elapsed = time.perf_counter() - started
+
+    return result
+
+
+def print_summary(summary: dict):
+    print("  ".join(f"{key}={value}" for key, value in summary.items()))
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(output: str, summaries: list[dict], parameters: dict) -> Path:
+    """Write ``summaries`` with the run's parameters and environment as JSON.
+
+    ``output`` is a file path, or a directory that gets a timestamped file so
+    successive runs accumulate side by side.
+    """
+    now = datetime.now(timezone.utc)
+    path = Path(output)
+    if path.suffix != ".json":
+        path.mkdir(parents=True, exist_ok=True)
+        path = path / f"bench-{now.strftime('%Y%m%dT%H%M%SZ')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "timestamp": now.isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "parameters": parameters,
+        "results": summaries,
+    }
+    path.write_text(json.dumps(document, indent=2, default=str))
+    return path
+
+
+async def time_calls(scenario: str, call: Callable[[int], Awaitable], runs: int) -> LoadResult:
+    """Await ``call`` sequentially ``runs`` times and collect latencies."""
+    result = LoadResult(scenario=scenario, requests=runs, concurrency=1, errors=0, elapsed=0.0)
+    started = time.perf_counter()
+    for number in range(runs):
+        call_started = time.perf_counter()
+        await call(number)
+        result.latencies.append(time.perf_counter() - call_started)
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+@contextmanager
+def count_statements(engine):
+    """Count statements sent by ``engine`` (an ``AsyncEngine``) inside the block."""
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter)
@@ -0,0 +1,45 @@
+"""Compare two benchmark results files scenario by scenario.
+
+    python -m benchmarks.compare benchmarks/results/bench-A.json benchmarks/results/bench-B.json
+
+Prints throughput and p50/p95/p99 of the second run relative to the first.
+Exits with status 1 when ``--max-regression`` is given and a scenario's p95
+grew by more than that percentage.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        document = json.load(file)
+    return {summary["scenario"]: summary for summary in document["results"]}
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main(args):
+    before, after = load(args.before), load(args.after)
+    regressed = []
+    for scenario in sorted(before.keys() & after.keys()):
+        changes = {metric: change(before[scenario][metric], after[scenario][metric]) for metric in METRICS}
+        print(f"{scenario:16} " + "  ".join(
+            f"{metric}={after[scenario][metric]} ({changes[metric]:+.1f}%)" for metric in METRICS))
+        if args.max_regression is not None and changes["p95_ms"] > args.max_regression:
+            regressed.append(scenario)
+    if regressed:
+        print(f"p95 regressed by more than {args.max_regression}%: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--max-regression", type=float, help="allowed p95 growth in percent")
+    main(parser.parse_args())
@@ -0,0 +1,57 @@
+"""Latency and statements per call of the order write path.
+
+    python -m benchmarks.seed --orders 0
+    python -m benchmarks.create_order --runs 500
+
+``read-after-write`` repeats the reads the previous implementation did after
+committing (refresh plus a full ``get_order_by_id``), ``returning`` is the
+current ``create_order`` alone.
+"""
+import argparse
+import asyncio
+import random
+
+from sqlalchemy import select
+
+from benchmarks.common import count_statements, print_summary, time_calls
+from src.database.db import SessionLocal, engine
+from src.database.models import Meal, Order
+from src.repository.orders import create_order, get_order_by_id
+from src.schemas.orders import OrderCreate
+
+
+def make_order(number: int, meal_ids: list) -> OrderCreate:
+    return OrderCreate.model_validate({
+        "customer": {"name": f"Bench {number}", "email": f"bench{number}@example.com",
+                     "street": "1 Main Street", "city": "Kyiv", "postal-code": "01001"},
+        "items": [{"id": meal_id, "quantity": 1} for meal_id in random.sample(meal_ids, k=min(3, len(meal_ids)))],
+    })
+
+
+async def main(args):
+    async with SessionLocal() as db:
+        meal_ids = (await db.execute(select(Meal.id).limit(100))).scalars().all()
+        if not meal_ids:
+            raise SystemExit("No meals found; seed some first.")
+
+        async def returning(number):
+            return await create_order(make_order(number, meal_ids), db)
+
+        async def read_after_write(number):
+            order = await create_order(make_order(number, meal_ids), db)
+            await db.execute(select(Order).where(Order.id == order.id))
+            return await get_order_by_id(order.id, db)
+
+        for name, call in (("read-after-write", read_after_write), ("returning", returning)):
+            with count_statements(engine) as counter:
+                result = await time_calls(name, call, args.runs)
+            summary = result.summary()
+            summary["statements_per_call"] = counter.count / args.runs
+            print_summary(summary)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
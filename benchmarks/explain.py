@@ -0,0 +1,269 @@
+"""Fail when a repository query plans a sequential scan of a large table.
+
+    python -m benchmarks.seed --meals 200 --orders 200000
+    python -m benchmarks.explain --min-rows 10000
+
+Every repository query is run once against the seeded database with
+``capture_queries`` and each captured statement is planned with ``EXPLAIN``
+using its captured parameters; an ``executemany`` statement is planned with its
+first parameter set, as every set gets the same plan. Writes run in a
+transaction that is rolled back: ``add_meal`` creates a meal that
+``update_meal``, ``set_file_name`` and ``delete_meal`` then work on, so no meal
+with orders is deleted, and ``claim_events`` claims the outbox events of the
+orders created, which ``mark_failed`` and ``mark_dispatched`` then update.
+Foreign keys are probed as well: deleting or updating a parent row makes
+Postgres look the key up in the child table, a statement that never shows up in
+a query log.
+
+Not planned: the ``COPY`` of order items in ``create_orders_bulk``. It is sent
+on the raw asyncpg connection, so it is not captured, and it only appends rows.
+
+A ``Seq Scan`` on a table whose planner estimate (``pg_class.reltuples``)
+exceeds ``--min-rows`` is reported, and the exit status is 1 when there is any.
+Smaller tables are skipped because a sequential scan is the right plan there.
+On a small database, such as the one the tests use, ``--force-index-scans``
+makes the planner use an index wherever one can serve the statement; the same
+audit runs in ``tests/test_query_plans.py``.
+"""
+import argparse
+import asyncio
+import random
+import re
+import sys
+from dataclasses import replace
+from datetime import timedelta
+from uuid import uuid4
+
+from sqlalchemy import and_, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from benchmarks.load import order_payload
+from src.database.db import engine
+from src.database.instrumentation import QueryRecord
+from src.database.models import Base, Meal, Order
+from src.config.config import settings
+from src.repository import analytics, meals, orders, outbox
+from src.schemas.meals import CreateMealModel, UpdateMealModel
+from src.schemas.orders import OrderCreate
+from src.services.cache import menu_cache
+from src.services.query_audit import capture_queries, explain_statement
+
+TABLE_SIZES = text("""
+    SELECT relname, reltuples FROM pg_class
+    WHERE relkind = 'r' AND relnamespace = current_schema()::regnamespace
+""")
+# Index -> (table, first column); the column is NULL for an expression index.
+LEADING_COLUMNS = text("""
+    SELECT index_class.relname, table_class.relname, pg_attribute.attname
+    FROM pg_index
+    JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+    JOIN pg_class table_class ON table_class.oid = pg_index.indrelid
+    LEFT JOIN pg_attribute ON pg_attribute.attrelid = pg_index.indrelid AND pg_attribute.attnum = pg_index.indkey[0]
+    WHERE table_class.relnamespace = current_schema()::regnamespace
+""")
+
+
+async def drain(generator):
+    async for _ in generator:
+        pass
+
+
+async def sample_rows(db: AsyncSession):
+    meal = (await db.execute(select(Meal.id, Meal.name).order_by(Meal.created_at, Meal.id).limit(1))).first()
+    order = (await db.execute(
+        select(Order.id, Order.customer_email, Order.created_at).order_by(Order.created_at.desc()).limit(1)
+    )).first()
+    if meal is None or order is None:
+        raise SystemExit("No meals or orders found; run benchmarks.seed first.")
+    return meal, order
+
+
+def repository_calls(meal, order) -> dict:
+    """Name -> coroutine factory for every repository query, with arguments that
+    select a small part of the data, as the API does."""
+    day = order.created_at.date()
+    rng = random.Random(1)
+    new_order = OrderCreate.model_validate(order_payload(rng, 0, [str(meal.id)]))
+    bulk_orders = [order_payload(rng, number, [str(meal.id)]) for number in range(1, 11)]
+    scratch = {}
+
+    async def add_meal(db):
+        scratch["meal"] = await meals.add_meal(CreateMealModel(name=f"explain {uuid4().hex}", price=1), db)
+
+    async def claim_events(db):
+        events = await outbox.claim_events(db, settings.outbox_batch_size, settings.outbox_max_attempts)
+        scratch["event_ids"] = [event.id for event in events]
+
+    return {
+        "meals.get_meal_all": lambda db: meals.get_meal_all(db, 20),
+        "meals.get_meal": lambda db: meals.get_meal(meal.id, db),
+        "meals.find_meal_by_name": lambda db: meals.find_meal_by_name(meal.name, db),
+        "meals.add_meal": add_meal,
+        "meals.update_meal": lambda db: meals.update_meal(UpdateMealModel(
+            id=scratch["meal"].id, name=f"{scratch['meal'].name} updated", price=2), db),
+        "meals.set_file_name": lambda db: meals.set_file_name(
+            scratch["meal"].id, "images/ex/explain.jpg", db, {"thumb": {"jpeg": "images/ex/explain-thumb.jpg"}}),
+        "meals.get_image_paths": lambda db: meals.get_image_paths(db),
+        "meals.delete_meal": lambda db: meals.delete_meal(scratch["meal"].id, db),
+        "orders.get_order_version": lambda db: orders.get_order_version(order.id, db),
+        "orders.get_order_by_id": lambda db: orders.get_order_by_id(order.id, db),
+        "orders.get_orders_by_customer_info_mask":
+            lambda db: orders.get_orders_by_customer_info_mask(order.customer_email, db, 20),
+        "orders.get_orders_by_meal_id": lambda db: orders.get_orders_by_meal_id(meal.id, db, 20),
+        "orders.stream_orders_export": lambda db: drain(orders.stream_orders_export(
+            db, order.created_at - timedelta(hours=1), order.created_at + timedelta(seconds=1), 1000)),
+        "orders.create_order": lambda db: orders.create_order(new_order, db),
+        "orders.create_orders_bulk": lambda db: orders.create_orders_bulk(bulk_orders, db),
+        "outbox.claim_events": claim_events,
+        "outbox.mark_failed": lambda db: outbox.mark_failed(db, scratch["event_ids"], "explain",
+                                                            settings.outbox_backoff_base, settings.outbox_backoff_max),
+        "outbox.mark_dispatched": lambda db: outbox.mark_dispatched(db, scratch["event_ids"]),
+        "outbox.purge_dispatched": lambda db: outbox.purge_dispatched(
+            db, timedelta(hours=settings.outbox_retention_hours)),
+        "analytics.get_top_meals": lambda db: analytics.get_top_meals(db, day - timedelta(days=30), day,
+                                                                      'revenue', 10),
+        "analytics.get_daily_sales": lambda db: analytics.get_daily_sales(db, day - timedelta(days=30), day),
+        "analytics.get_daily_sales(meal)": lambda db: analytics.get_daily_sales(db, day - timedelta(days=30), day,
+                                                                                meal.id),
+    }
+
+
+async def foreign_key_probes(db: AsyncSession) -> dict:
+    """Name -> coroutine factory looking up an existing key in each referencing table,
+    as the checks run on ``DELETE`` of the referenced row do."""
+    probes = {}
+    for table in Base.metadata.sorted_tables:
+        for constraint in table.foreign_key_constraints:
+            columns = list(constraint.columns)
+            key = (await db.execute(select(*columns).limit(1))).first()
+            if key is None:
+                continue
+            name = f"fk {table.name}({', '.join(column.name for column in columns)})"
+            query = (select(literal(1)).select_from(table)
+                     .where(and_(*(column == value for column, value in zip(columns, key))))
+                     .with_for_update(key_share=True))
+            probes[name] = lambda db, query=query: db.execute(query)
+    return probes
+
+
+def first_execution(record: QueryRecord) -> QueryRecord:
+    # A batch of SQLAlchemy's "insertmanyvalues" is reported as executemany too,
+    # but it is one multi-row INSERT with a flat tuple of parameters.
+    if not record.executemany:
+        return record
+    parameters = record.parameters[0] if isinstance(record.parameters, list) else record.parameters
+    return replace(record, parameters=parameters, executemany=False)
+
+
+# Planner options turned off by --force-index-scans; a hash or merge join would
+# read the whole table on each side, as a sequential scan does.
+FORCE_INDEX_SCANS = ("enable_seqscan", "enable_hashjoin", "enable_mergejoin")
+
+# Nodes that pass the order of their outer input on to a LIMIT above them.
+ORDER_PRESERVING = {"Limit", "LockRows", "Nested Loop", "Subquery Scan", "Result"}
+
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def full_scans(plan: dict, leading_columns: dict, index_scans: bool = False, limited: bool = False):
+    """(table, description) of every scan reading a whole table or index.
+
+    An index condition without the first column of the index, such as
+    ``meal_id = $1`` on a ``(order_id, meal_id)`` key, is checked against every
+    entry of the index (a "skip scan" on Postgres 18). With ``index_scans`` index
+    scans without any condition are reported too, as a sequential scan turns into
+    one when ``enable_seqscan`` is off, unless they walk the index in order for a
+    ``LIMIT`` and stop after a page of rows.
+    """
+    node_type = plan.get("Node Type")
+    if node_type == "Seq Scan":
+        yield plan["Relation Name"], f"Seq Scan on {plan['Relation Name']}"
+    elif node_type in INDEX_SCANS:
+        table, leading_column = leading_columns.get(plan["Index Name"], (plan.get("Relation Name"), None))
+        condition = plan.get("Index Cond")
+        if condition is None and index_scans and not limited:
+            yield table, f"{node_type} on {table} without an index condition"
+        elif condition is not None and leading_column and not re.search(rf'\({leading_column}\b', condition):
+            yield table, f"{node_type} on {table} using {plan['Index Name']} without {leading_column}"
+    limited = node_type == "Limit" or (limited and node_type in ORDER_PRESERVING)
+    for child in plan.get("Plans", ()):
+        yield from full_scans(child, leading_columns, index_scans,
+                              limited and child.get("Parent Relationship") == "Outer")
+
+
+async def audit(name: str, call, db: AsyncSession, checked, table_sizes: dict, leading_columns: dict,
+                plan_conn: AsyncConnection | None = None, index_scans: bool = False) -> list[str]:
+    with capture_queries() as log:
+        await call(db)
+    problems = []
+    for record in log.records:
+        plan = await explain_statement(first_execution(record), plan_conn)
+        if plan is None:
+            continue
+        if isinstance(plan, dict):
+            problems.append(f"{name}: EXPLAIN failed: {plan['error']}\n    {record.statement}")
+            continue
+        for table, scan in full_scans(plan[0]["Plan"], leading_columns, index_scans):
+            if checked(table):
+                size = f" (~{table_sizes[table]:.0f} rows)" if table_sizes.get(table, 0) > 0 else ""
+                problems.append(f"{name}: {scan}{size}\n    {record.statement}")
+    print(f"{name:44} {len(log.records)} statements  {'FAIL' if problems else 'ok'}")
+    return problems
+
+
+async def audit_repository(min_rows: int, force_index_scans: bool = False,
+                           tables: set[str] | None = None) -> list[str]:
+    """Problems found in the plans of every repository query and foreign key probe.
+
+    With ``force_index_scans`` the statements are planned with sequential scans,
+    hash joins and merge joins off, so a full scan is left only where no index can
+    serve the statement; that finds a missing index on a database too small for
+    the planner to prefer one, such as the test database. ``tables`` replaces the
+    ``min_rows`` filter: only those tables are checked, whatever their size.
+    """
+    # Only the SQL is audited; the rolled-back writes must not invalidate cached menus.
+    menu_cache.enabled = False
+    problems = []
+    async with engine.connect() as conn, engine.connect() as plan_conn:
+        # Autocommit, so a failed EXPLAIN does not abort the ones after it.
+        await plan_conn.execution_options(isolation_level="AUTOCOMMIT")
+        if force_index_scans:
+            for option in FORCE_INDEX_SCANS:
+                await plan_conn.exec_driver_sql(f"SET {option} = off")
+        transaction = await conn.begin()
+        table_sizes = dict((await conn.execute(TABLE_SIZES)).all())
+        leading_columns = {index: (table, column) for index, table, column in await conn.execute(LEADING_COLUMNS)}
+
+        def checked(table):
+            return table in tables if tables is not None else table_sizes.get(table, 0) > min_rows
+
+        # Commits inside the repository release a savepoint, so the outer
+        # transaction can still roll every write back.
+        async with AsyncSession(bind=conn, join_transaction_mode="create_savepoint",
+                                expire_on_commit=False) as db:
+            meal, order = await sample_rows(db)
+            calls = {**repository_calls(meal, order), **await foreign_key_probes(db)}
+            for name, call in calls.items():
+                problems += await audit(name, call, db, checked, table_sizes, leading_columns, plan_conn,
+                                        force_index_scans)
+        await transaction.rollback()
+    return problems
+
+
+async def main(args):
+    problems = await audit_repository(args.min_rows, args.force_index_scans)
+    await engine.dispose()
+
+    if problems:
+        print(f"\n{len(problems)} problems:\n" + "\n".join(problems))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-rows", type=int, default=10_000,
+                        help="ignore sequential scans of tables with fewer estimated rows")
+    parser.add_argument("--force-index-scans", action="store_true",
+                        help="plan without sequential scans, hash and merge joins to find missing indexes "
+                             "on a small database")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""Round trips and per-order cost of order hydration.
+
+    python -m benchmarks.seed --meals 50 --orders 200000
+    python -m benchmarks.hydration --limit 200 --runs 30
+
+Compares the single-query ``get_orders_by_meal_id`` with the previous
+two-phase approach (orders first, then an ``IN`` query for the items,
+both loaded as ORM entities) on the most ordered meal.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import func, select
+
+from benchmarks.common import count_statements, print_summary, time_calls
+from src.database.db import SessionLocal, engine
+from src.database.models import Meal, Order, order_meals
+from src.repository.orders import get_orders_by_meal_id
+from src.schemas.orders import OrderMealOut, OrderOut, OrderOutCustomer
+
+
+async def two_phase_orders_by_meal_id(meal_id, db, limit):
+    orders = (await db.execute(
+        select(Order)
+        .join(order_meals, Order.id == order_meals.c.order_id)
+        .where(order_meals.c.meal_id == meal_id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(limit)
+    )).scalars().all()
+    order_items = (await db.execute(
+        select(Meal, order_meals.c.order_id, order_meals.c.quantity)
+        .join(order_meals, Meal.id == order_meals.c.meal_id)
+        .where(order_meals.c.order_id.in_([order.id for order in orders]))
+    )).all()
+    items_by_order = {}
+    for meal, order_id, quantity in order_items:
+        items_by_order.setdefault(order_id, []).append(OrderMealOut(
+            id=meal.id, name=meal.name, price=meal.price, description=meal.description,
+            image=meal.image, quantity=quantity))
+    return [
+        OrderOut(id=order.id,
+                 customer=OrderOutCustomer(name=order.customer_name, email=order.customer_email,
+                                           street=order.customer_street, city=order.customer_city,
+                                           postal_code=order.customer_postal_code),
+                 items=items_by_order.get(order.id, []),
+                 total=order.total,
+                 created_at=order.created_at, updated_at=order.updated_at)
+        for order in orders
+    ]
+
+
+async def measure(name, call, runs, limit):
+    cpu_started = time.process_time()
+    with count_statements(engine) as counter:
+        result = await time_calls(name, call, runs)
+    summary = result.summary()
+    summary["round_trips_per_call"] = counter.count / runs
+    summary["cpu_us_per_order"] = round((time.process_time() - cpu_started) / (runs * limit) * 1e6, 1)
+    print_summary(summary)
+
+
+async def main(args):
+    async with SessionLocal() as db:
+        meal_id = (await db.execute(
+            select(order_meals.c.meal_id).group_by(order_meals.c.meal_id)
+            .order_by(func.count().desc()).limit(1)
+        )).scalar_one()
+
+        async def single_query(number):
+            db.expunge_all()
+            return await get_orders_by_meal_id(meal_id, db, args.limit)
+
+        async def two_phase(number):
+            db.expunge_all()
+            return await two_phase_orders_by_meal_id(meal_id, db, args.limit)
+
+        await measure("two-phase", two_phase, args.runs, args.limit)
+        await measure("single-query", single_query, args.runs, args.limit)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=30)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,91 @@
+"""Concurrent throughput and latency of the main API scenarios against a running app.
+
+Start the app (``uvicorn main:app --workers 1``) on a seeded database, then run
+
+    python -m benchmarks.load --base-url http://localhost:8000 --requests 2000 --concurrency 50 \\
+        --output benchmarks/results/
+
+Scenarios: ``menu`` and ``meal`` read the menu, ``create-order`` posts orders
+shaped like the seeded ones, ``customer-search`` searches names, cities and
+email fragments, ``by-meal`` lists the orders of popular and rare meals.
+With ``--output`` the summaries are also written to a JSON results file, see
+``benchmarks/compare.py``. ``benchmarks/run.py`` does the whole run, database
+included.
+"""
+import argparse
+import asyncio
+import random
+
+import httpx
+
+from benchmarks.common import print_summary, run_load, write_results
+from benchmarks.seed import CITIES, FIRST_NAMES, LAST_NAMES, STREETS
+
+SEARCH_TERMS = [*LAST_NAMES, *CITIES, *(name.lower() for name in FIRST_NAMES), 'example.com', 'Street 1']
+
+
+def order_payload(rng: random.Random, number: int, meal_ids: list[str]) -> dict:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    city = rng.choice(list(CITIES))
+    return {
+        "customer": {"name": f"{first} {last}", "email": f"bench.{first}.{number}@example.com".lower(),
+                     "street": f"{rng.randint(1, 250)} {rng.choice(STREETS)} Street", "city": city,
+                     "postal-code": f"{CITIES[city][1]}{rng.randint(0, 999):03d}"},
+        "items": [{"id": meal_id, "quantity": rng.choice((1, 1, 1, 2))}
+                  for meal_id in rng.sample(meal_ids, k=min(rng.choice((1, 1, 2, 2, 3)), len(meal_ids)))],
+    }
+
+
+def make_scenarios(meal_ids: list[str], random_seed: int = 1) -> dict:
+    rng = random.Random(random_seed)
+    return {
+        "menu": lambda client, number: client.get("/api/meals/"),
+        "meal": lambda client, number: client.get(f"/api/meals/{meal_ids[number % len(meal_ids)]}"),
+        "create-order": lambda client, number: client.post("/api/orders/", json=order_payload(rng, number, meal_ids)),
+        "customer-search": lambda client, number: client.get(
+            f"/api/orders/customer/{SEARCH_TERMS[number % len(SEARCH_TERMS)]}"),
+        "by-meal": lambda client, number: client.get(f"/api/orders/meal/{meal_ids[number % len(meal_ids)]}"),
+    }
+
+
+SCENARIO_NAMES = sorted(make_scenarios(['']))
+
+
+async def fetch_meal_ids(base_url: str) -> list[str]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        response = await client.get("/api/meals/", params={"limit": 200})
+        response.raise_for_status()
+        meal_ids = [meal["id"] for meal in response.json()]
+    if not meal_ids:
+        raise SystemExit("No meals found; run benchmarks.seed first.")
+    return meal_ids
+
+
+async def run_scenarios(base_url: str, scenarios: list[str], requests: int, concurrency: int,
+                        random_seed: int = 1) -> list[dict]:
+    available = make_scenarios(await fetch_meal_ids(base_url), random_seed)
+    summaries = []
+    for scenario in scenarios:
+        result = await run_load(scenario, available[scenario], base_url, requests, concurrency)
+        summary = result.summary()
+        print_summary(summary)
+        summaries.append(summary)
+    return summaries
+
+
+async def main(args):
+    summaries = await run_scenarios(args.base_url, args.scenario, args.requests, args.concurrency, args.random_seed)
+    if args.output:
+        path = write_results(args.output, summaries, vars(args))
+        print(f"results written to {path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIO_NAMES, default=SCENARIO_NAMES)
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--output", help="results file, or a directory for a timestamped one")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,45 @@
+"""Latency of the customer search query on a large orders table.
+
+    python -m benchmarks.seed --meals 50 --orders 1000000
+    python -m benchmarks.search --runs 50 --explain
+
+Compare runs before and after ``alembic upgrade head`` creates the trigram index.
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import text
+
+from benchmarks.common import print_summary, time_calls
+from src.database.db import SessionLocal, engine
+from src.database.models import order_search_document
+from src.repository.orders import _like_pattern, get_orders_by_customer_info_mask
+
+TERMS = ['customer4821', 'Odesa', 'a3f9', '04512', 'street']
+
+
+async def explain(db, term: str):
+    document = order_search_document.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True})
+    statement = f"EXPLAIN (ANALYZE, BUFFERS) SELECT id FROM orders WHERE {document} ILIKE :pattern"
+    plan = (await db.execute(text(statement), {"pattern": _like_pattern(term)})).scalars().all()
+    print("\n".join(plan))
+
+
+async def main(args):
+    async with SessionLocal() as db:
+        for term in args.terms:
+            result = await time_calls(f"search:{term}",
+                                      lambda number: get_orders_by_customer_info_mask(term, db),
+                                      args.runs)
+            print_summary(result.summary())
+            if args.explain:
+                await explain(db, term)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--terms", nargs="+", default=TERMS)
+    parser.add_argument("--explain", action="store_true")
+    asyncio.run(main(parser.parse_args()))
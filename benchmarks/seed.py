@@ -0,0 +1,178 @@
+"""Fill the database with synthetic meals and orders.
+
+    python -m benchmarks.seed --meals 200 --orders 1000000 --days 90 --random-seed 1
+
+Rows are generated from the tables in ``src/database/models.py`` with skewed,
+repeatable distributions so that plans and cache hit rates resemble production:
+
+* meal popularity follows a Zipf law, so a few meals are in most orders;
+* most orders have one to three distinct meals, usually one portion each;
+* customers come back: a third as many customers as orders, a few ordering often;
+* orders cluster around lunch and dinner over the last ``--days`` days.
+
+Orders and their items are loaded with ``COPY`` in batches, so a million orders
+take about a minute. The same ``--random-seed`` always produces the same data;
+meal names are unique, so seed meals once per database (``--meals 0`` adds
+orders only).
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, text
+
+from src.database.db import engine
+from src.database.models import Meal, Order, order_meals
+from src.repository.analytics import rebuild_stats
+
+FIRST_NAMES = ('Olena', 'Andrii', 'Iryna', 'Dmytro', 'Oksana', 'Taras', 'Natalia', 'Serhii', 'Yulia', 'Oleksandr',
+               'Maria', 'Ivan', 'Kateryna', 'Mykola', 'Sofia', 'Bohdan', 'Anna', 'Vasyl', 'Daria', 'Yurii')
+LAST_NAMES = ('Shevchenko', 'Kovalenko', 'Bondarenko', 'Tkachenko', 'Kravchenko', 'Melnyk', 'Boyko', 'Oliinyk',
+              'Koval', 'Shevchuk', 'Polishchuk', 'Lysenko', 'Marchenko', 'Rudenko', 'Savchenko', 'Petrenko')
+STREETS = ('Khreshchatyk', 'Shevchenka', 'Franka', 'Sadova', 'Lesi Ukrainky', 'Hrushevskoho', 'Zelena',
+           'Soborna', 'Nezalezhnosti', 'Velyka Vasylkivska', 'Kyrylivska', 'Peremohy')
+# City -> (share of customers, postal code prefix).
+CITIES = {'Kyiv': (0.38, '01'), 'Lviv': (0.16, '79'), 'Odesa': (0.14, '65'), 'Kharkiv': (0.12, '61'),
+          'Dnipro': (0.1, '49'), 'Poltava': (0.05, '36'), 'Vinnytsia': (0.05, '21')}
+EMAIL_DOMAINS = ('example.com', 'mail.example', 'inbox.example')
+DISHES = ('Borscht', 'Varenyky', 'Holubtsi', 'Deruny', 'Banosh', 'Chicken Kyiv', 'Syrnyky', 'Salo', 'Uzvar',
+          'Kapusniak', 'Pampushky', 'Nalysnyky', 'Mlyntsi', 'Kruchenyky', 'Solianka', 'Kulesh', 'Pyrizhky')
+STYLES = ('Classic', 'Hutsul', 'Poltava', 'Homemade', 'Spicy', 'Vegan', 'Smoked', 'Grandma\'s', 'Festive', 'Mini')
+
+ITEMS_PER_ORDER = {1: 0.35, 2: 0.3, 3: 0.2, 4: 0.1, 5: 0.05}
+QUANTITY = {1: 0.72, 2: 0.18, 3: 0.07, 4: 0.03}
+# Relative order volume per hour of day.
+HOURLY = (1, 0.5, 0.3, 0.2, 0.2, 0.3, 0.8, 1.5, 2, 2, 3, 6, 9, 8, 5, 3, 3, 5, 9, 10, 8, 5, 3, 2)
+BATCH_SIZE = 10_000
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def make_meals(rng: random.Random, count: int, now: datetime) -> list[dict]:
+    names = [f"{style} {dish}" for dish, style in itertools.product(DISHES, STYLES)]
+    rng.shuffle(names)
+    meals = []
+    for number in range(count):
+        name = names[number] if number < len(names) else f"{names[number % len(names)]} {number // len(names)}"
+        created_at = now - timedelta(days=rng.uniform(0, 365))
+        meals.append({
+            "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+            "name": name,
+            "price": round(min(40.0, max(2.0, rng.lognormvariate(2.2, 0.45))), 2),
+            "description": f"{name} made to order",
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+    return meals
+
+
+def make_customers(rng: random.Random, count: int) -> list[dict]:
+    cities = list(CITIES)
+    city_weights = [share for share, _ in CITIES.values()]
+    customers = []
+    for number in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        city = rng.choices(cities, city_weights)[0]
+        customers.append({
+            "customer_name": f"{first} {last}",
+            "customer_email": f"{first}.{last}{number}@{rng.choice(EMAIL_DOMAINS)}".lower(),
+            "customer_street": f"{rng.randint(1, 250)} {rng.choice(STREETS)} Street",
+            "customer_city": city,
+            "customer_postal_code": f"{CITIES[city][1]}{rng.randint(0, 999):03d}",
+        })
+    return customers
+
+
+def make_orders(rng: random.Random, count: int, meals: list, days: int, now: datetime):
+    """Yield batches of ``(order_records, item_records)`` ready for ``COPY``.
+
+    ``meals`` are ``(id, name, price)`` rows; lines snapshot the name and price.
+    """
+    popularity = list(meals)
+    rng.shuffle(popularity)
+    meal_weights = list(itertools.accumulate(zipf_weights(len(popularity), 1.1)))
+    customers = make_customers(rng, max(1, count // 3))
+    customer_weights = list(itertools.accumulate(zipf_weights(len(customers), 0.8)))
+    item_counts, item_weights = zip(*ITEMS_PER_ORDER.items())
+    quantities, quantity_weights = zip(*QUANTITY.items())
+
+    orders, items = [], []
+    for _ in range(count):
+        order_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+        customer = rng.choices(customers, cum_weights=customer_weights)[0]
+        created_at = (now - timedelta(days=1 + rng.randrange(days))).replace(
+            hour=rng.choices(range(24), HOURLY)[0], minute=rng.randrange(60), second=rng.randrange(60))
+
+        wanted = min(rng.choices(item_counts, item_weights)[0], len(popularity))
+        chosen = set()
+        while len(chosen) < wanted:
+            chosen.add(rng.choices(popularity, cum_weights=meal_weights)[0])
+        lines = [(order_id, meal.id, rng.choices(quantities, quantity_weights)[0], meal.price, meal.name)
+                 for meal in chosen]
+        items.extend(lines)
+        orders.append((order_id, customer["customer_name"], customer["customer_email"],
+                       customer["customer_street"], customer["customer_city"], customer["customer_postal_code"],
+                       sum(price * quantity for _, _, quantity, price, _ in lines), created_at, created_at))
+
+        if len(orders) == BATCH_SIZE:
+            yield orders, items
+            orders, items = [], []
+    if orders:
+        yield orders, items
+
+
+ORDER_COPY_COLUMNS = [column.name for column in (Order.id, Order.customer_name, Order.customer_email,
+                                                 Order.customer_street, Order.customer_city,
+                                                 Order.customer_postal_code, Order.total, Order.created_at,
+                                                 Order.updated_at)]
+ITEM_COPY_COLUMNS = [column.name for column in (order_meals.c.order_id, order_meals.c.meal_id,
+                                                order_meals.c.quantity, order_meals.c.unit_price,
+                                                order_meals.c.meal_name)]
+
+
+async def seed(meals: int, orders: int, days: int = 90, random_seed: int = 1):
+    rng = random.Random(random_seed)
+    now = datetime.now().replace(microsecond=0)
+    async with engine.begin() as conn:
+        if meals:
+            await conn.execute(insert(Meal), make_meals(rng, meals, now))
+        if orders:
+            meal_rows = (await conn.execute(
+                select(Meal.id, Meal.name, Meal.price).order_by(Meal.created_at, Meal.id))).all()
+            if not meal_rows:
+                raise SystemExit("No meals to order; seed with --meals first.")
+            driver_connection = (await conn.get_raw_connection()).driver_connection
+            for order_records, item_records in make_orders(rng, orders, meal_rows, days, now):
+                await driver_connection.copy_records_to_table(Order.__tablename__, records=order_records,
+                                                              columns=ORDER_COPY_COLUMNS)
+                await driver_connection.copy_records_to_table(order_meals.name, records=item_records,
+                                                              columns=ITEM_COPY_COLUMNS)
+            # COPY bypasses create_order, so the sales aggregates are recomputed.
+            await rebuild_stats(conn)
+        await conn.execute(text("ANALYZE meals"))
+        await conn.execute(text("ANALYZE orders"))
+        await conn.execute(text("ANALYZE order_meals"))
+        await conn.execute(text("ANALYZE meal_daily_stats"))
+        await conn.execute(text("ANALYZE daily_sales"))
+
+
+async def main(args):
+    started = time.perf_counter()
+    await seed(args.meals, args.orders, args.days, args.random_seed)
+    await engine.dispose()
+    print(f"seeded meals={args.meals} orders={args.orders} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meals", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--random-seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,68 @@
+"""p50/p99 of returning a large order list through FastAPI.
+
+    python -m benchmarks.serialization --orders 1000 --runs 200
+
+Runs in process with no database: the same list of ``OrderOut`` objects is
+returned once through ``response_model`` (validated and encoded again by
+FastAPI) and once pre-encoded with ``json_response``.
+"""
+import argparse
+import asyncio
+import uuid
+from datetime import datetime
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.common import print_summary, time_calls
+from src.schemas.orders import OrderMealOut, OrderOut, OrderOutCustomer, order_list_adapter
+from src.services.serialization import json_response
+
+
+def make_orders(count: int, items: int) -> list[OrderOut]:
+    return [
+        OrderOut.model_construct(
+            id=uuid.uuid4(),
+            customer=OrderOutCustomer.model_construct(name=f"Customer {number}", email=f"c{number}@example.com",
+                                                      street="1 Main Street", city="Kyiv", postal_code="01001"),
+            items=[OrderMealOut.model_construct(id=uuid.uuid4(), name=f"Meal {item}", price=9.5,
+                                                description="Synthetic meal", image=None, quantity=2)
+                   for item in range(items)],
+            total=19.0 * items,
+            created_at=datetime.now(),
+            updated_at=datetime.now(),
+        )
+        for number in range(count)
+    ]
+
+
+def make_app(orders: list[OrderOut]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/response-model", response_model=List[OrderOut])
+    async def response_model():
+        return orders
+
+    @app.get("/pre-encoded", response_model=List[OrderOut])
+    async def pre_encoded():
+        return json_response(order_list_adapter, orders)
+
+    return app
+
+
+async def main(args):
+    app = make_app(make_orders(args.orders, args.items))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for path in ("/response-model", "/pre-encoded"):
+            await client.get(path)
+            result = await time_calls(path.strip("/"), lambda number: client.get(path), args.runs)
+            print_summary(result.summary())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,5 @@
+#!/bin/bash
+# Run once by the postgres image on first start of the primary: lets the
+# replica stream WAL as the superuser over the compose network.
+set -e
+echo "host replication ${POSTGRES_USER} all scram-sha-256" >> "$PGDATA/pg_hba.conf"
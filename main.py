@@ -1,34 +1,78 @@
 import asyncio
-
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
 
 import uvicorn
-from fastapi import Depends, FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+
+from src.routes import analytics, health, meals, orders, system
+from src.config.config import settings
+from src.database.replicas import ReadYourWritesMiddleware, replicas
+from src.services.cache import menu_cache
+from src.services.files import image_gc_loop
+from src.services.health import readiness
+from src.services.images import shutdown_image_workers, start_image_workers
+from src.services.outbox import make_sink, outbox_loop
+from src.services.metrics import MetricsMiddleware, mark_process_dead, render_metrics
+from src.services.query_audit import QueryAuditMiddleware
+from src.services.redis import close_redis
+from src.services.static import ImmutableStaticFiles
+from src.services.storage import close_storage
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Built before any task starts so that a misconfigured sink stops the app
+    # instead of a background task dying unnoticed.
+    outbox_sink = make_sink() if settings.outbox_enabled else None
+    cache_listener = asyncio.create_task(menu_cache.listen())
+    image_gc = asyncio.create_task(image_gc_loop())
+    outbox = asyncio.create_task(outbox_loop(outbox_sink)) if outbox_sink is not None else None
+    start_image_workers()
+    yield
+    cache_listener.cancel()
+    image_gc.cancel()
+    if outbox is not None:
+        outbox.cancel()
+        await asyncio.gather(outbox, return_exceptions=True)
+    shutdown_image_workers()
+    await close_storage()
+    await replicas.dispose()
+    await close_redis()
+    mark_process_dead()
 
-from src.routes import meals, orders
-from src.database.db import get_db
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan,
+              default_response_class=ORJSONResponse if settings.fast_json else JSONResponse)
+
+if settings.query_audit_enabled:
+    app.add_middleware(QueryAuditMiddleware)
+if settings.database_replica_urls:
+    app.add_middleware(ReadYourWritesMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(meals.router, prefix='/api')
 app.include_router(orders.router, prefix='/api')
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.include_router(system.router, prefix='/api')
+app.include_router(health.router, prefix='/api')
+app.include_router(analytics.router, prefix='/api')
+app.mount("/static", ImmutableStaticFiles(directory="static"), name="static")
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 
 @app.get("/api/healthchecker")
-async def healthchecker(db: Session = Depends(get_db)):
-    try:
-        result = await asyncio.wait_for(db.execute(text("SELECT 1")).fetchone(), timeout=5)
-        if result is None:
-            raise HTTPException(status_code=500, detail="Database is not configured correctly")
-        return {"status": "OK", "message": "Database connection is healthy"}
-    except asyncio.TimeoutError:
-        raise HTTPException(status_code=500, detail="Timeout error: Database is not responding")
-    except Exception as e:
-        print("Error:", e)
+async def healthchecker():
+    # Kept for existing clients; backed by the cached readiness probe.
+    result = await readiness.check()
+    if result["checks"]["database"]["status"] != "OK":
         raise HTTPException(status_code=500, detail="Error connecting to the database")
+    return {"status": "OK", "message": "Database connection is healthy"}
 
 
 if __name__ == '__main__':
@@ -1,2 +1,5 @@
 STATIC_DIR = './static/'
 ADD_IMAGE_DIR = 'images/'
+DIRECT_UPLOAD_DIR = 'uploads/'
+# Target widths of the generated meal image variants; smaller originals are not upscaled.
+IMAGE_VARIANTS = {'thumb': 160, 'card': 480, 'full': 1280}
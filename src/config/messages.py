@@ -5,3 +5,15 @@ MEALS_NOT_FOUND = "These meals were not found: {meals}."
 ERROR_UPLOAD_FILE = "Error upload file: {error}."
 ERROR_DELETE_MEAL = "Error delete meal {id}: {error}."
 PROHIBITED_FILE_CONTENT = "Prohibited file content '{content_type}'. Only images are allowed to be uploaded."
+INVALID_CURSOR = "Invalid pagination cursor."
+BULK_ORDERS_TOO_MANY = "Too many orders in one request: {count}. The limit is {limit}."
+DUPLICATE_ORDER_ITEMS = "These meals are listed more than once: {meals}."
+IDEMPOTENCY_IN_PROGRESS = "A request with this Idempotency-Key is still being processed."
+IDEMPOTENCY_KEY_REUSED = "This Idempotency-Key was already used with a different request body."
+FILE_TOO_LARGE = "The file is too large. The limit is {limit} bytes."
+NOT_AN_IMAGE = "The file is not an image in a supported format."
+IMAGE_TOO_LARGE = "The image is too large. The limit is {limit} pixels."
+INVALID_UPLOAD_KEY = "The upload key does not belong to this meal."
+UPLOAD_NOT_FOUND = "The uploaded file was not found in storage."
+DIRECT_UPLOAD_UNAVAILABLE = "Direct uploads are not supported by the configured storage backend."
+INVALID_DATE_RANGE = "Invalid date range: start must not be after end and the range may span at most {days} days."
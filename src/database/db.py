@@ -1,18 +1,45 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from uuid import uuid4
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from src.config.config import settings
+from src.database.instrumentation import instrument_engine
+from src.database.pool import InstrumentedQueuePool
 
 DATABASE_URL = settings.database_url
+ASYNC_DATABASE_URL = make_url(DATABASE_URL).set(drivername='postgresql+asyncpg')
+
+
+def engine_options(url=ASYNC_DATABASE_URL):
+    options = {
+        "echo": settings.db_echo,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if settings.db_pgbouncer:
+        # PgBouncer in transaction mode may run each transaction on a different
+        # server connection, so prepared statements must be neither cached nor
+        # reused under a predictable name.
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return url, options
+
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_url, _options = engine_options()
+engine = create_async_engine(_url, **_options)
+instrument_engine(engine)
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
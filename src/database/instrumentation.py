@@ -0,0 +1,115 @@
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+
+from src.services.metrics import DB_POOL_CAPACITY, DB_POOL_CHECKED_OUT, DB_QUERIES, DB_QUERY_DURATION
+
+# Repository function whose statements are being executed. SQLAlchemy runs the
+# sync engine events in a greenlet that shares the calling task's context.
+current_function: ContextVar[str] = ContextVar('db_function', default='other')
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    parameters: Any
+    duration: float
+    function: str
+    executemany: bool
+
+
+@dataclass
+class QueryLog:
+    records: list[QueryRecord] = field(default_factory=list)
+
+
+# Log of the current request, see QueryAuditMiddleware.
+current_log: ContextVar[QueryLog | None] = ContextVar('query_log', default=None)
+# Logs that see every statement of the process, see capture_queries.
+global_logs: list[QueryLog] = []
+
+
+def track_queries(func):
+    """Attribute the statements executed inside ``func`` to ``<module>.<name>`` in the DB metrics."""
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def generator_wrapper(*args, **kwargs):
+            # The caller's context is active between items, so the label is set
+            # only while the generator itself runs.
+            generator = func(*args, **kwargs)
+            try:
+                while True:
+                    token = current_function.set(name)
+                    try:
+                        item = await generator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        current_function.reset(token)
+                    yield item
+            finally:
+                await generator.aclose()
+        return generator_wrapper
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = current_function.set(name)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            current_function.reset(token)
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_started'].pop()
+    function = current_function.get()
+    DB_QUERIES.labels(function).inc()
+    DB_QUERY_DURATION.labels(function).observe(duration)
+
+    log = current_log.get()
+    if log is not None or global_logs:
+        record = QueryRecord(statement, parameters, duration, function, executemany)
+        if log is not None:
+            log.records.append(record)
+        for global_log in global_logs:
+            global_log.records.append(record)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_started'):
+        conn.info['query_started'].pop()
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKED_OUT.inc()
+
+
+def _checkin(dbapi_connection, connection_record):
+    DB_POOL_CHECKED_OUT.dec()
+
+
+def instrument_engine(engine, track_pool: bool = True):
+    """Record the statements of ``engine``; with ``track_pool`` its pool also backs the pool gauges."""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(sync_engine, 'handle_error', _handle_error)
+    if not track_pool:
+        return
+    event.listen(sync_engine, 'checkout', _checkout)
+    event.listen(sync_engine, 'checkin', _checkin)
+    pool = sync_engine.pool
+    DB_POOL_CAPACITY.set(pool.size() + max(getattr(pool, '_max_overflow', 0), 0))
@@ -1,8 +1,9 @@
 import uuid
 
-from sqlalchemy import Column, String, DateTime, Numeric, Integer, ForeignKey, Table, func
+from sqlalchemy import (Column, String, Date, DateTime, Numeric, Integer, BigInteger, SmallInteger, ForeignKey,
+                        Identity, Index, Table, func, literal_column)
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -11,31 +12,108 @@ Base = declarative_base()
 class Meal(Base):
     __tablename__ = "meals"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, unique=True, nullable=False)
     price = Column(Numeric(10, 2), nullable=False)
     description = Column(String)
     image = Column(String)
-    created_at = Column(DateTime, default=func.now())
+    image_variants = Column(JSONB)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        Index('ix_meals_created_at_id', 'created_at', 'id'),
+    )
+
 
 order_meals = Table('order_meals', Base.metadata,
                     Column('order_id', UUID(as_uuid=True), ForeignKey('orders.id'), primary_key=True),
                     Column('meal_id', UUID(as_uuid=True), ForeignKey('meals.id'), primary_key=True),
-                    Column('quantity', Integer, default=1)
+                    Column('quantity', Integer, default=1),
+                    # Name and price of the meal when the order was placed.
+                    Column('unit_price', Numeric(10, 2), nullable=False),
+                    Column('meal_name', String, nullable=False),
+                    Index('ix_order_meals_meal_id_order_id', 'meal_id', 'order_id')
                     )
 
 
 class Order(Base):
     __tablename__ = "orders"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     meals = relationship("Meal", secondary=order_meals, backref="orders")
     customer_name = Column(String(200), nullable=False)
     customer_email = Column(String(255), nullable=False)
     customer_street = Column(String(200), nullable=False)
     customer_city = Column(String(150), nullable=False)
     customer_postal_code = Column(String(10), nullable=False)
-    created_at = Column(DateTime, default=func.now())
+    total = Column(Numeric(12, 2), nullable=False)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('ix_orders_created_at_id', 'created_at', 'id'),
+    )
+
+
+# Text searched by GET /api/orders/customer/{search_term}. The trigram index below
+# is built on exactly this expression, so queries must use it unchanged.
+_separator = literal_column("' '", String)
+order_search_document = (Order.customer_name + _separator + Order.customer_email + _separator
+                         + Order.customer_street + _separator + Order.customer_city + _separator
+                         + Order.customer_postal_code)
+
+Index('ix_orders_customer_search_trgm', order_search_document.label('customer_search'),
+      postgresql_using='gin', postgresql_ops={'customer_search': 'gin_trgm_ops'})
+
+
+class MealDailyStats(Base):
+    """Sales of one meal on one day, maintained by the order write paths.
+
+    Split over ``shard`` rows like ``DailySales``: orders of a popular meal would
+    otherwise all update, and queue on, the same row.
+    """
+    __tablename__ = "meal_daily_stats"
+
+    meal_id = Column(UUID(as_uuid=True), ForeignKey('meals.id', ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_meal_daily_stats_day', 'day'),
+    )
+
+
+class DailySales(Base):
+    """Sales of one day, split over ``shard`` rows so concurrent orders do not queue on one row lock."""
+    __tablename__ = "daily_sales"
+
+    day = Column(Date, primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+class OrderEvent(Base):
+    """Transactional outbox: events written with the orders and sent downstream by the dispatcher."""
+    __tablename__ = "order_events"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    event_type = Column(String(50), nullable=False)
+    order_id = Column(UUID(as_uuid=True), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    # Pending until dispatched_at is set; a failed send moves available_at back.
+    available_at = Column(DateTime, default=func.now(), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String)
+    dispatched_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_order_events_pending', 'available_at', 'id', postgresql_where=dispatched_at.is_(None)),
+        Index('ix_order_events_dispatched_at', 'dispatched_at', postgresql_where=dispatched_at.isnot(None)),
+    )
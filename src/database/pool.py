@@ -0,0 +1,62 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.services.metrics import DB_POOL_TIMEOUTS, DB_POOL_WAIT
+
+
+class PoolStats:
+    """Counters for connection checkouts of this worker's pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_checkout(self, wait: float):
+        DB_POOL_WAIT.observe(wait)
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self, pool) -> dict:
+        size = pool.size()
+        max_overflow = getattr(pool, '_max_overflow', 0)
+        capacity = size + max(max_overflow, 0)
+        checked_out = pool.checkedout()
+        return {
+            "size": size,
+            "max_overflow": max_overflow,
+            "checked_in": pool.checkedin(),
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "saturation": round(checked_out / capacity, 3) if capacity else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that measures how long each checkout waits for a connection.
+
+    The measured time includes opening a new connection and the pre-ping, which
+    is what a request actually waits for before its first query.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            pool_stats.record_checkout(time.perf_counter() - started)
@@ -0,0 +1,124 @@
+"""Routing of read-only requests to streaming replicas.
+
+Sessions from ``get_read_db`` go to the replicas in ``database_replica_urls``
+in round-robin order. A replica that cannot be connected to is skipped for
+``replica_retry_after`` seconds and the next one is tried; when none is left,
+or none is configured, the primary serves the read.
+
+Replicas lag behind the primary, so after a successful write
+``ReadYourWritesMiddleware`` sets a cookie that sends the client's reads to the
+primary for ``replica_sticky_seconds``: a client always sees its own orders.
+"""
+import itertools
+import logging
+import time
+
+from fastapi import Request
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.config.config import settings
+from src.database.db import SessionLocal, engine_options
+from src.database.instrumentation import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'db_primary'
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+class Replica:
+    def __init__(self, url: str):
+        url, options = engine_options(make_url(url).set(drivername='postgresql+asyncpg'))
+        # A down replica must fail fast so the next one can serve the read;
+        # the pool statistics and gauges stay those of the primary.
+        options["poolclass"] = AsyncAdaptedQueuePool
+        options["connect_args"] = {**options.get("connect_args", {}), "timeout": settings.replica_connect_timeout}
+        self.name = url.render_as_string(hide_password=True)
+        self.engine = create_async_engine(url, **options)
+        instrument_engine(self.engine, track_pool=False)
+        self.failed_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.failed_until
+
+
+class ReplicaSet:
+    def __init__(self, urls: list[str], retry_after: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.retry_after = retry_after
+        self._counter = itertools.count()
+
+    def _candidates(self) -> list[Replica]:
+        if not self.replicas:
+            return []
+        start = next(self._counter) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in ordered if replica.available]
+
+    def _mark_failed(self, replica: Replica, error: Exception):
+        replica.failed_until = time.monotonic() + self.retry_after
+        logger.warning("Replica %s unavailable for %ss: %s", replica.name, self.retry_after, error)
+
+    async def session(self) -> AsyncSession | None:
+        """Return a session already connected to the next reachable replica, or None."""
+        for replica in self._candidates():
+            db = SessionLocal(bind=replica.engine)
+            try:
+                await db.connection()
+                return db
+            except (exc.SQLAlchemyError, OSError) as e:
+                await db.close()
+                self._mark_failed(replica, e)
+        return None
+
+    def snapshot(self) -> list[dict]:
+        return [{"replica": replica.name, "status": "OK" if replica.available else "FAIL"}
+                for replica in self.replicas]
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replicas = ReplicaSet(settings.database_replica_urls, settings.replica_retry_after)
+
+
+async def read_session(request: Request) -> AsyncSession:
+    """Session for read-only repository functions: a replica, or the primary
+    after the client's recent write or when no replica is reachable."""
+    if STICKY_COOKIE not in request.cookies:
+        db = await replicas.session()
+        if db is not None:
+            return db
+    return SessionLocal()
+
+
+# Dependency
+async def get_read_db(request: Request):
+    async with await read_session(request) as db:
+        yield db
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client to the primary for a while after each successful write."""
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie = (f"{STICKY_COOKIE}=1; Max-Age={settings.replica_sticky_seconds}; Path=/; "
+                       f"HttpOnly; SameSite=Lax").encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message['type'] == 'http.response.start' and message['status'] < 400:
+                message['headers'] = [*message.get('headers', ()), (b'set-cookie', self.cookie)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
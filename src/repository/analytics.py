@@ -0,0 +1,142 @@
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.config import settings
+from src.database.instrumentation import track_queries
+from src.database.models import DailySales, Meal, MealDailyStats
+
+
+def _increment(table, keys: list[str]):
+    statement = insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={column: getattr(table, column) + getattr(statement.excluded, column)
+              for column in ('order_count', 'quantity', 'revenue')},
+    )
+
+
+async def record_order_stats(db: AsyncSession, lines: list[tuple[UUID, date, UUID, int, Decimal]]):
+    """Add order lines ``(order_id, day, meal_id, quantity, unit_price)`` to the sales aggregates.
+
+    Runs inside the caller's transaction, so the aggregates commit or roll back
+    with the orders. Every row goes to one random shard, so concurrent orders,
+    even of the same meal, mostly update different rows. Rows are upserted in
+    key order: transactions on the same shard lock them in the same order and
+    cannot deadlock.
+    """
+    meal_days = defaultdict(lambda: [0, 0, Decimal(0)])
+    days = defaultdict(lambda: [set(), 0, Decimal(0)])
+    for order_id, day, meal_id, quantity, unit_price in lines:
+        revenue = unit_price * quantity
+        stats = meal_days[(meal_id, day)]
+        stats[0] += 1
+        stats[1] += quantity
+        stats[2] += revenue
+        totals = days[day]
+        totals[0].add(order_id)
+        totals[1] += quantity
+        totals[2] += revenue
+
+    if not meal_days:
+        return
+    shard = random.randrange(settings.analytics_shards)
+    await db.execute(_increment(MealDailyStats, ['meal_id', 'day', 'shard']), [
+        {"meal_id": meal_id, "day": day, "shard": shard, "order_count": order_count, "quantity": quantity,
+         "revenue": revenue}
+        for (meal_id, day), (order_count, quantity, revenue) in sorted(meal_days.items())
+    ])
+    await db.execute(_increment(DailySales, ['day', 'shard']), [
+        {"day": day, "shard": shard, "order_count": len(order_ids), "quantity": quantity, "revenue": revenue}
+        for day, (order_ids, quantity, revenue) in sorted(days.items())
+    ])
+
+
+REBUILD_MEAL_DAILY_STATS = text("""
+    INSERT INTO meal_daily_stats (meal_id, day, shard, order_count, quantity, revenue)
+    SELECT om.meal_id, o.created_at::date, 0, count(*), sum(om.quantity), sum(om.quantity * om.unit_price)
+    FROM order_meals om
+    JOIN orders o ON o.id = om.order_id
+    GROUP BY om.meal_id, o.created_at::date
+""")
+
+REBUILD_DAILY_SALES = text("""
+    INSERT INTO daily_sales (day, shard, order_count, quantity, revenue)
+    SELECT o.created_at::date, 0, count(DISTINCT o.id), sum(om.quantity), sum(om.quantity * om.unit_price)
+    FROM orders o
+    JOIN order_meals om ON om.order_id = o.id
+    GROUP BY o.created_at::date
+""")
+
+
+async def rebuild_stats(db):
+    """Recompute the aggregates from the orders; for data loaded around ``create_order``."""
+    await db.execute(delete(MealDailyStats))
+    await db.execute(delete(DailySales))
+    await db.execute(REBUILD_MEAL_DAILY_STATS)
+    await db.execute(REBUILD_DAILY_SALES)
+
+
+@track_queries
+async def get_top_meals(db: AsyncSession, start: date, end: date, by: str, limit: int) -> list:
+    """Best-selling meals between ``start`` and ``end`` inclusive.
+
+    Reads at most ``analytics_shards`` rows per meal and day, however many orders there are.
+    """
+    totals = (
+        select(MealDailyStats.meal_id,
+               func.sum(MealDailyStats.order_count).label('order_count'),
+               func.sum(MealDailyStats.quantity).label('quantity'),
+               func.sum(MealDailyStats.revenue).label('revenue'))
+        .where(MealDailyStats.day.between(start, end))
+        .group_by(MealDailyStats.meal_id)
+        .subquery()
+    )
+    return (await db.execute(
+        select(totals.c.meal_id, Meal.name, totals.c.order_count, totals.c.quantity, totals.c.revenue)
+        .join(Meal, Meal.id == totals.c.meal_id)
+        .order_by(totals.c[by].desc(), totals.c.meal_id)
+        .limit(limit)
+    )).all()
+
+
+@track_queries
+async def get_daily_sales(db: AsyncSession, start: date, end: date, meal_id: UUID | None = None) -> list:
+    """One row per day between ``start`` and ``end`` inclusive; days without sales are zero."""
+    if meal_id is None:
+        query = (
+            select(DailySales.day,
+                   func.sum(DailySales.order_count).label('order_count'),
+                   func.sum(DailySales.quantity).label('quantity'),
+                   func.sum(DailySales.revenue).label('revenue'))
+            .where(DailySales.day.between(start, end))
+            .group_by(DailySales.day)
+        )
+    else:
+        query = (
+            select(MealDailyStats.day,
+                   func.sum(MealDailyStats.order_count).label('order_count'),
+                   func.sum(MealDailyStats.quantity).label('quantity'),
+                   func.sum(MealDailyStats.revenue).label('revenue'))
+            .where(MealDailyStats.meal_id == meal_id, MealDailyStats.day.between(start, end))
+            .group_by(MealDailyStats.day)
+        )
+    sales = {row.day: row for row in (await db.execute(query)).all()}
+    days = []
+    day = start
+    while day <= end:
+        row = sales.get(day)
+        days.append({
+            "day": day,
+            "order_count": row.order_count if row else 0,
+            "quantity": row.quantity if row else 0,
+            "revenue": row.revenue if row else Decimal(0),
+        })
+        day += timedelta(days=1)
+    return days
@@ -2,60 +2,94 @@ from uuid import UUID
 
 from fastapi import HTTPException, status
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config.messages import DUPLICATE_MEAL_NAME
+from src.database.instrumentation import track_queries
 from src.database.models import Meal
 from src.schemas.meals import CreateMealModel, UpdateMealModel
+from src.services.cache import menu_cache
+from src.services.pagination import CREATED_AT_ID, Page, decode_cursor, make_page
 
 
-async def add_meal(body: CreateMealModel, db: Session):
+@track_queries
+async def add_meal(body: CreateMealModel, db: AsyncSession):
     meal = Meal(**body.model_dump())
     if await find_meal_by_name(meal.name, db):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=DUPLICATE_MEAL_NAME.format(meal_name=meal.name))
     db.add(meal)
-    db.commit()
-    db.refresh(meal)
+    await db.commit()
+    await db.refresh(meal)
+    await menu_cache.invalidate_meal(meal.id)
     return meal
 
 
-async def update_meal(body: UpdateMealModel, db: Session):
+@track_queries
+async def update_meal(body: UpdateMealModel, db: AsyncSession):
     meal = Meal(**body.model_dump())
     existing_meal_name = await find_meal_by_name(meal.name, db)
     if existing_meal_name and (meal.id != existing_meal_name.id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=DUPLICATE_MEAL_NAME.format(meal_name=meal.name))
-    db.merge(meal)
-    db.commit()
-    db.refresh(meal)
+    meal = await db.merge(meal)
+    await db.commit()
+    await db.refresh(meal)
+    await menu_cache.invalidate_meal(meal.id)
     return meal
 
 
-async def get_meal_all(db: Session):
-    return db.query(Meal).all()
+@track_queries
+async def get_meal_all(db: AsyncSession, limit: int, cursor: str | None = None) -> Page:
+    query = select(Meal).order_by(Meal.created_at, Meal.id).limit(limit + 1)
+    if cursor:
+        query = query.where(tuple_(Meal.created_at, Meal.id) > tuple(decode_cursor(cursor, *CREATED_AT_ID)))
+    meals = (await db.execute(query)).scalars().all()
+    return make_page(meals, limit, lambda meal: (meal.created_at, meal.id))
 
 
-async def get_meal(id: UUID, db: Session):
-    return db.query(Meal).filter(Meal.id == id).first()
+@track_queries
+async def get_meal(id: UUID, db: AsyncSession):
+    result = await db.execute(select(Meal).where(Meal.id == id))
+    return result.scalars().first()
 
 
-async def find_meal_by_name(name: str, db: Session):
-    return db.query(Meal).filter(Meal.name == name).first()
+@track_queries
+async def find_meal_by_name(name: str, db: AsyncSession):
+    result = await db.execute(select(Meal).where(Meal.name == name))
+    return result.scalars().first()
 
 
-async def delete_meal(id: UUID, db: Session):
-    count = db.query(Meal).filter(Meal.id == id).delete()
-    db.commit()
-    return count
+@track_queries
+async def delete_meal(id: UUID, db: AsyncSession):
+    result = await db.execute(delete(Meal).where(Meal.id == id))
+    await db.commit()
+    await menu_cache.invalidate_meal(id)
+    return result.rowcount
 
 
-async def set_file_name(id: UUID, file_name: str, db: Session):
-    meal = db.query(Meal).filter(Meal.id == id).first()
+@track_queries
+async def set_file_name(id: UUID, file_name: str, db: AsyncSession, image_variants: dict | None = None):
+    meal = await get_meal(id, db)
     if meal:
         meal.image = file_name
-        db.commit()
-        db.refresh(meal)
+        meal.image_variants = image_variants
+        await db.commit()
+        await db.refresh(meal)
+        await menu_cache.invalidate_meal(id)
     return meal
+
+
+@track_queries
+async def get_image_paths(db: AsyncSession) -> set[str]:
+    """Every image path referenced by a meal, including all variants."""
+    paths = set()
+    for image, image_variants in (await db.execute(select(Meal.image, Meal.image_variants))).all():
+        if image:
+            paths.add(image)
+        for variant_paths in (image_variants or {}).values():
+            paths.update(variant_paths.values())
+    return paths
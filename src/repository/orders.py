@@ -1,203 +1,346 @@
-from uuid import UUID
+from datetime import datetime
+from uuid import UUID, uuid4
 
 from fastapi import HTTPException, status
 
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from src.config.messages import CREATE_ORDER_ERROR, MEALS_NOT_FOUND
-from src.database.models import Meal, Order, order_meals
-from src.schemas.orders import OrderCreate, OrderOut, OrderOutCustomer, OrderMealOut
+from pydantic import ValidationError
+from sqlalchemy import any_, bindparam, func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.util import ClauseAdapter
+from src.config.messages import CREATE_ORDER_ERROR, DUPLICATE_ORDER_ITEMS, MEALS_NOT_FOUND
+from src.database.instrumentation import track_queries
+from src.database.models import Meal, Order, order_meals, order_search_document
+from src.repository.analytics import record_order_stats
+from src.repository.outbox import order_created_event, record_order_events
+from src.schemas.orders import BulkOrderResult, OrderCreate, OrderOut, OrderOutCustomer, OrderMealOut
+from src.services.outbox import wake_dispatcher
+from src.services.pagination import CREATED_AT_ID, Page, decode_cursor, make_page
 
 
-async def get_order_by_id(id: UUID, db: Session):
-    db_order = db.query(Order).filter(Order.id == id).first()
-    if not db_order:
-        return None
-
-    order_items = (
-        db.query(Meal, order_meals.c.quantity)
-        .join(order_meals, Meal.id == order_meals.c.meal_id)
-        .filter(order_meals.c.order_id == id)
-        .all()
+@track_queries
+async def get_order_version(id: UUID, db: AsyncSession):
+    """Return ``(updated_at, meals_updated_at)`` of an order without loading it, or None."""
+    result = await db.execute(
+        select(Order.updated_at, func.max(Meal.updated_at))
+        .select_from(Order)
+        .outerjoin(order_meals, Order.id == order_meals.c.order_id)
+        .outerjoin(Meal, Meal.id == order_meals.c.meal_id)
+        .where(Order.id == id)
+        .group_by(Order.id)
     )
+    return result.first()
 
-    return OrderOut(
-        id=db_order.id,
-        customer=OrderOutCustomer(
-            name=db_order.customer_name,
-            email=db_order.customer_email,
-            street=db_order.customer_street,
-            city=db_order.customer_city,
-            postal_code=db_order.customer_postal_code,
-        ),
-        items=[
-            OrderMealOut(
-                id=meal.id,
-                name=meal.name,
-                price=meal.price,
-                description=meal.description,
-                image=meal.image,
-                quantity=quantity,
-            )
-            for meal, quantity in order_items
-        ],
-        created_at=db_order.created_at,
-        updated_at=db_order.updated_at,
-    )
 
+# Order columns selected by every hydrated read; rows never become ORM objects.
+ORDER_COLUMNS = (Order.id, Order.customer_name, Order.customer_email, Order.customer_street,
+                 Order.customer_city, Order.customer_postal_code, Order.total, Order.created_at, Order.updated_at)
 
 
-async def get_orders_by_customer_info_mask(search_term: str, db: Session):
-    orders = (
-        db.query(Order)
-        .filter(
-            or_(
-                Order.customer_email.like(f'%{search_term}%'),
-                Order.customer_name.like(f'%{search_term}%'),
-                Order.customer_street.like(f'%{search_term}%'),
-                Order.customer_city.like(f'%{search_term}%'),
-                Order.customer_postal_code.like(f'%{search_term}%')
-            )
-        )
-        .order_by(Order.created_at.desc())
-        .all()
-    )
+async def _hydrate_orders(db: AsyncSession, page_query, ordering) -> list[tuple]:
+    """Load a page of orders together with their line items in one round trip.
 
-    if not orders:
-        return []
-
-    order_ids = [order.id for order in orders]
-    order_items = (
-        db.query(Meal, order_meals.c.order_id, order_meals.c.quantity)
-        .join(order_meals, Meal.id == order_meals.c.meal_id)
-        .filter(order_meals.c.order_id.in_(order_ids))
-        .all()
+    ``page_query`` selects ``ORDER_COLUMNS`` (plus any sort columns) with its filters,
+    ``ordering`` and limit applied. It becomes a subquery that is joined to the line
+    items, and the flat rows are folded into ``OrderOut`` objects in page order.
+    The subquery is left exactly as built, so Postgres can still use a top-N sort or
+    an index for its ``ORDER BY ... LIMIT``. ``ordering`` is applied again, to the
+    subquery's columns, to sort the joined rows; it ends with the order id, so the
+    rows of one order stay together.
+    Returns ``(page_row, OrderOut)`` pairs so callers can build cursors from the
+    page row's sort columns. Database rows are trusted, so the DTOs are built with
+    ``model_construct`` and are validated nowhere; routes serialize them once.
+    """
+    page = page_query.subquery('page')
+    page_ordering = [ClauseAdapter(page).traverse(term.expression) for term in ordering]
+    rows = await db.execute(
+        select(page, order_meals.c.meal_id, order_meals.c.quantity, order_meals.c.meal_name,
+               order_meals.c.unit_price, Meal.description, Meal.image)
+        .select_from(page)
+        .outerjoin(order_meals, order_meals.c.order_id == page.c.id)
+        .outerjoin(Meal, Meal.id == order_meals.c.meal_id)
+        .order_by(*page_ordering)
     )
 
-    items_by_order = {}
-    for meal, order_id, quantity in order_items:
-        if order_id not in items_by_order:
-            items_by_order[order_id] = []
-        items_by_order[order_id].append(
-            OrderMealOut(
-                id=meal.id,
-                name=meal.name,
-                price=meal.price,
-                description=meal.description,
-                image=meal.image,
-                quantity=quantity,
-            )
-        )
+    orders = []
+    items = []
+    for row in rows:
+        if not orders or orders[-1][0].id != row.id:
+            items = []
+            orders.append((row, items))
+        if row.meal_id is not None:
+            items.append(OrderMealOut.model_construct(
+                id=row.meal_id,
+                name=row.meal_name,
+                price=float(row.unit_price),
+                description=row.description,
+                image=row.image,
+                quantity=row.quantity,
+            ))
 
     return [
-        OrderOut(
-            id=order.id,
-            customer=OrderOutCustomer(
-                name=order.customer_name,
-                email=order.customer_email,
-                street=order.customer_street,
-                city=order.customer_city,
-                postal_code=order.customer_postal_code,
+        (row, OrderOut.model_construct(
+            id=row.id,
+            customer=OrderOutCustomer.model_construct(
+                name=row.customer_name,
+                email=row.customer_email,
+                street=row.customer_street,
+                city=row.customer_city,
+                postal_code=row.customer_postal_code,
             ),
-            items=items_by_order.get(order.id, []),
-            created_at=order.created_at,
-            updated_at=order.updated_at,
-        )
-        for order in orders
+            items=items,
+            total=float(row.total),
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        ))
+        for row, items in orders
     ]
 
 
-async def get_orders_by_meal_id(meal_id: int, db: Session):
-    orders = (
-        db.query(Order)
-        .join(order_meals, Order.id == order_meals.c.order_id)  # Соединяем с таблицей связи заказов и блюд
-        .filter(order_meals.c.meal_id == meal_id)  # Фильтруем по meal_id
-        .order_by(Order.created_at.desc())  # Сортируем по дате создания (новые сначала)
-        .all()
+def _order_page(orders: list[tuple], limit: int, sort_key) -> Page:
+    page = make_page(orders, limit, lambda order: sort_key(order[0]))
+    page.items = [order for _, order in page.items]
+    return page
+
+
+@track_queries
+async def get_order_by_id(id: UUID, db: AsyncSession):
+    orders = await _hydrate_orders(db, select(*ORDER_COLUMNS).where(Order.id == id), (Order.id,))
+    return orders[0][1] if orders else None
+
+
+def _like_pattern(search_term: str) -> str:
+    escaped = search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+@track_queries
+async def get_orders_by_customer_info_mask(search_term: str, db: AsyncSession,
+                                           limit: int, cursor: str | None = None) -> Page:
+    # ILIKE over the indexed search document is served by the pg_trgm GIN index;
+    # word_similarity ranks closer matches first, so the keyset includes the rank.
+    rank = func.word_similarity(search_term, order_search_document)
+    ordering = (rank.desc(), Order.created_at.desc(), Order.id.desc())
+    query = (
+        select(*ORDER_COLUMNS, rank.label('rank'))
+        .where(order_search_document.ilike(_like_pattern(search_term), escape='\\'))
+        .order_by(*ordering)
+        .limit(limit + 1)
     )
+    if cursor:
+        query = query.where(tuple_(rank, Order.created_at, Order.id)
+                            < tuple(decode_cursor(cursor, float, *CREATED_AT_ID)))
+    orders = await _hydrate_orders(db, query, ordering)
+    return _order_page(orders, limit, lambda row: (row.rank, row.created_at, row.id))
 
-    if not orders:
-        return []
-
-    order_ids = [order.id for order in orders]
-    order_items = (
-        db.query(Meal, order_meals.c.order_id, order_meals.c.quantity)
-        .join(order_meals, Meal.id == order_meals.c.meal_id)
-        .filter(order_meals.c.order_id.in_(order_ids))
-        .all()
+
+@track_queries
+async def get_orders_by_meal_id(meal_id: UUID, db: AsyncSession,
+                                limit: int, cursor: str | None = None) -> Page:
+    ordering = (Order.created_at.desc(), Order.id.desc())  # Сортируем по дате создания (новые сначала)
+    query = (
+        select(*ORDER_COLUMNS)
+        .join(order_meals, Order.id == order_meals.c.order_id)  # Соединяем с таблицей связи заказов и блюд
+        .where(order_meals.c.meal_id == meal_id)  # Фильтруем по meal_id
+        .order_by(*ordering)
+        .limit(limit + 1)
     )
+    if cursor:
+        query = query.where(tuple_(Order.created_at, Order.id) < tuple(decode_cursor(cursor, *CREATED_AT_ID)))
+    orders = await _hydrate_orders(db, query, ordering)
+    return _order_page(orders, limit, lambda row: (row.created_at, row.id))
 
-    items_by_order = {}
-    for meal, order_id, quantity in order_items:
-        if order_id not in items_by_order:
-            items_by_order[order_id] = []
-        items_by_order[order_id].append(
-            OrderMealOut(
-                id=meal.id,
-                name=meal.name,
-                price=meal.price,
-                description=meal.description,
-                image=meal.image,
-                quantity=quantity,
-            )
-        )
 
-    return [
-        OrderOut(
-            id=order.id,
-            customer=OrderOutCustomer(
-                name=order.customer_name,
-                email=order.customer_email,
-                street=order.customer_street,
-                city=order.customer_city,
-                postal_code=order.customer_postal_code,
-            ),
-            items=items_by_order.get(order.id, []),
-            created_at=order.created_at,
-            updated_at=order.updated_at,
-        )
-        for order in orders
-    ]
+@track_queries
+async def stream_orders_export(db: AsyncSession, start: datetime | None, end: datetime | None,
+                               batch_size: int):
+    """Yield flat order/item rows in (created_at, id) order through a server-side cursor.
+
+    Names, prices and totals are the snapshots stored with the order, so ``meals``
+    is not read.
+    """
+    query = (
+        select(Order.id, Order.customer_name, Order.customer_email, Order.customer_street,
+               Order.customer_city, Order.customer_postal_code, Order.total, Order.created_at, Order.updated_at,
+               order_meals.c.meal_id, order_meals.c.meal_name, order_meals.c.unit_price.label('price'),
+               order_meals.c.quantity)
+        .select_from(Order)
+        .outerjoin(order_meals, Order.id == order_meals.c.order_id)
+        .order_by(Order.created_at, Order.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if start is not None:
+        query = query.where(Order.created_at >= start)
+    if end is not None:
+        query = query.where(Order.created_at < end)
+
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        for row in partition:
+            yield row
 
 
-async def create_order(order: OrderCreate, db: Session):
+@track_queries
+async def create_order(order: OrderCreate, db: AsyncSession):
+    """Insert an order and build its response from the validated meals and the
+    ``RETURNING`` timestamps, without reading the order back."""
     try:
         meal_ids = [meal.id for meal in order.items]
-        existing_meals = db.query(Meal.id).filter(Meal.id.in_(meal_ids)).all()
-        existing_meal_ids = {meal.id for meal in existing_meals}
+        meals = {meal.id: meal for meal in (await db.execute(
+            select(Meal.id, Meal.name, Meal.price, Meal.description, Meal.image).where(Meal.id.in_(meal_ids))
+        )).all()}
 
-        missing_meals = set(meal_ids) - existing_meal_ids
+        missing_meals = set(meal_ids) - meals.keys()
         if missing_meals:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=MEALS_NOT_FOUND.format(meals=missing_meals))
 
-        order_in_db = Order(
-            customer_name=order.customer.name,
-            customer_email=order.customer.email,
-            customer_street=order.customer.street,
-            customer_city=order.customer.city,
-            customer_postal_code=order.customer.postal_code,
-        )
-        db.add(order_in_db)
-        db.flush()
+        total = sum(meals[item.id].price * item.quantity for item in order.items)
+        order_id = uuid4()
+        created_at, updated_at = (await db.execute(
+            insert(Order)
+            .values(
+                id=order_id,
+                customer_name=order.customer.name,
+                customer_email=order.customer.email,
+                customer_street=order.customer.street,
+                customer_city=order.customer.city,
+                customer_postal_code=order.customer.postal_code,
+                total=total,
+            )
+            .returning(Order.created_at, Order.updated_at)
+        )).one()
 
         order_meal_entries = []
         for item in order.items:
             order_meal_entries.append({
-                "order_id": order_in_db.id,
+                "order_id": order_id,
                 "meal_id": item.id,
-                "quantity": item.quantity
+                "quantity": item.quantity,
+                "unit_price": meals[item.id].price,
+                "meal_name": meals[item.id].name,
             })
 
-        db.execute(order_meals.insert(), order_meal_entries)
-        db.commit()
+        await db.execute(order_meals.insert(), order_meal_entries)
+        await record_order_stats(db, [(order_id, created_at.date(), item.id, item.quantity, meals[item.id].price)
+                                      for item in order.items])
+        await record_order_events(db, [order_created_event(order_id, order, meals, total, created_at)])
+        await db.commit()
+        wake_dispatcher()
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail=CREATE_ORDER_ERROR.format(error=str(e)))
 
-    db.refresh(order_in_db)
+    return OrderOut.model_construct(
+        id=order_id,
+        customer=OrderOutCustomer.model_construct(
+            name=order.customer.name,
+            email=order.customer.email,
+            street=order.customer.street,
+            city=order.customer.city,
+            postal_code=order.customer.postal_code,
+        ),
+        items=[
+            OrderMealOut.model_construct(
+                id=item.id,
+                name=meals[item.id].name,
+                price=float(meals[item.id].price),
+                description=meals[item.id].description,
+                image=meals[item.id].image,
+                quantity=item.quantity,
+            )
+            for item in order.items
+        ],
+        total=float(total),
+        created_at=created_at,
+        updated_at=updated_at,
+    )
+
+
+def _validation_error(error: ValidationError) -> str:
+    return '; '.join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors())
+
+
+@track_queries
+async def create_orders_bulk(raw_orders: list[dict], db: AsyncSession) -> list[BulkOrderResult]:
+    """Validate and insert many orders in one transaction, reporting a result per order.
+
+    All meal ids are checked with one query, orders go in as batched multi-row
+    ``INSERT ... RETURNING`` and line items are loaded with ``COPY``.
+    """
+    results = [BulkOrderResult(index=index) for index in range(len(raw_orders))]
+    orders = {}
+    for index, raw_order in enumerate(raw_orders):
+        try:
+            order = OrderCreate.model_validate(raw_order)
+        except ValidationError as e:
+            results[index].error = _validation_error(e)
+            continue
+        meal_ids = [item.id for item in order.items]
+        duplicates = {meal_id for meal_id in meal_ids if meal_ids.count(meal_id) > 1}
+        if duplicates:
+            results[index].error = DUPLICATE_ORDER_ITEMS.format(meals=duplicates)
+            continue
+        orders[index] = order
+
+    requested_meal_ids = list({item.id for order in orders.values() for item in order.items})
+    meals = {}
+    if requested_meal_ids:
+        meals = {meal.id: meal for meal in (await db.execute(
+            select(Meal.id, Meal.name, Meal.price).where(Meal.id == any_(bindparam(
+                'meal_ids', requested_meal_ids, type_=ARRAY(PG_UUID(as_uuid=True)))))
+        )).all()}
+    for index, order in list(orders.items()):
+        missing_meals = {item.id for item in order.items} - meals.keys()
+        if missing_meals:
+            results[index].error = MEALS_NOT_FOUND.format(meals=missing_meals)
+            del orders[index]
+
+    if not orders:
+        return results
+
+    order_rows = []
+    item_records = []
+    totals = {}
+    for index, order in orders.items():
+        results[index].id = uuid4()
+        totals[index] = sum(meals[item.id].price * item.quantity for item in order.items)
+        order_rows.append({
+            "id": results[index].id,
+            "customer_name": order.customer.name,
+            "customer_email": order.customer.email,
+            "customer_street": order.customer.street,
+            "customer_city": order.customer.city,
+            "customer_postal_code": order.customer.postal_code,
+            "total": totals[index],
+        })
+        item_records.extend((results[index].id, item.id, item.quantity, meals[item.id].price, meals[item.id].name)
+                            for item in order.items)
+
+    try:
+        inserted = await db.execute(insert(Order).returning(Order.id, Order.created_at), order_rows)
+        created_at = dict(inserted.all())
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            order_meals.name, records=item_records,
+            columns=['order_id', 'meal_id', 'quantity', 'unit_price', 'meal_name'])
+        await record_order_stats(db, [(order_id, created_at[order_id].date(), meal_id, quantity, unit_price)
+                                      for order_id, meal_id, quantity, unit_price, _ in item_records])
+        await record_order_events(db, [
+            order_created_event(results[index].id, order, meals, totals[index], created_at[results[index].id])
+            for index, order in orders.items()
+        ])
+        await db.commit()
+        wake_dispatcher()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=CREATE_ORDER_ERROR.format(error=str(e)))
 
-    return await get_order_by_id(order_in_db.id, db)
+    for index in orders:
+        results[index].created_at = created_at[results[index].id]
+    return results
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import delete, func, insert, literal_column, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.instrumentation import track_queries
+from src.database.models import OrderEvent
+from src.schemas.orders import OrderCreate
+
+ORDER_CREATED = 'order.created'
+SECOND = literal_column("interval '1 second'")
+
+
+def order_created_event(order_id: UUID, order: OrderCreate, meals: dict, total: Decimal,
+                        created_at: datetime) -> dict:
+    """Outbox row for a new order; ``meals`` maps meal ids to rows with ``name`` and ``price``."""
+    return {
+        "event_type": ORDER_CREATED,
+        "order_id": order_id,
+        "payload": {
+            "id": str(order_id),
+            "customer": order.customer.model_dump(mode='json'),
+            "items": [{"id": str(item.id), "name": meals[item.id].name, "price": float(meals[item.id].price),
+                       "quantity": item.quantity}
+                      for item in order.items],
+            "total": float(total),
+            "created_at": created_at.isoformat(),
+        },
+    }
+
+
+async def record_order_events(db: AsyncSession, events: list[dict]):
+    """Queue events inside the caller's transaction: they are sent only if the orders commit."""
+    if events:
+        await db.execute(insert(OrderEvent), events)
+
+
+@track_queries
+async def claim_events(db: AsyncSession, limit: int, max_attempts: int) -> list[OrderEvent]:
+    """Lock up to ``limit`` due events in id order until the transaction ends.
+
+    ``SKIP LOCKED`` lets every worker run a dispatcher: each one claims a
+    different batch instead of waiting for, or sending, another's.
+    """
+    result = await db.execute(
+        select(OrderEvent)
+        .where(OrderEvent.dispatched_at.is_(None),
+               OrderEvent.available_at <= func.now(),
+               OrderEvent.attempts < max_attempts)
+        .order_by(OrderEvent.available_at, OrderEvent.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return list(result.scalars().all())
+
+
+@track_queries
+async def mark_dispatched(db: AsyncSession, ids: list[int]):
+    await db.execute(update(OrderEvent).where(OrderEvent.id.in_(ids)).values(dispatched_at=func.now()))
+
+
+@track_queries
+async def mark_failed(db: AsyncSession, ids: list[int], error: str, backoff_base: float, backoff_max: float):
+    """Count a failed attempt and retry after ``backoff_base * 2 ** attempts`` seconds, at most ``backoff_max``."""
+    delay = func.least(backoff_max, backoff_base * func.power(2, OrderEvent.attempts))
+    await db.execute(
+        update(OrderEvent)
+        .where(OrderEvent.id.in_(ids))
+        .values(attempts=OrderEvent.attempts + 1,
+                last_error=error[:1000],
+                available_at=func.now() + delay * SECOND)
+    )
+
+
+@track_queries
+async def purge_dispatched(db: AsyncSession, older_than: timedelta) -> int:
+    result = await db.execute(
+        delete(OrderEvent).where(OrderEvent.dispatched_at < func.now() - older_than))
+    return result.rowcount
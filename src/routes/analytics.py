@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+from typing import List
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, Query, status, APIRouter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.config import settings
+from src.config.messages import INVALID_DATE_RANGE
+from src.database.replicas import get_read_db
+from src.repository import analytics as repository_analytics
+from src.schemas.analytics import DailySalesOut, MealSalesOut, TopMealsOrder
+
+router = APIRouter(prefix="/analytics", tags=['analytics'])
+
+
+def date_range(start: date | None = None, end: date | None = None) -> tuple[date, date]:
+    """``start``/``end`` query parameters, inclusive; the last 30 days by default."""
+    end = end or date.today()
+    start = start or end - timedelta(days=29)
+    if start > end or (end - start).days >= settings.analytics_max_days:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=INVALID_DATE_RANGE.format(days=settings.analytics_max_days))
+    return start, end
+
+
+@router.get('/top-meals', name='Best-selling meals',
+            response_model=List[MealSalesOut],
+            status_code=status.HTTP_200_OK)
+async def get_top_meals(period: tuple[date, date] = Depends(date_range),
+                        by: TopMealsOrder = TopMealsOrder.revenue,
+                        limit: int = Query(10, ge=1, le=100),
+                        db: AsyncSession = Depends(get_read_db)):
+    return await repository_analytics.get_top_meals(db, *period, by.value, limit)
+
+
+@router.get('/sales', name='Daily sales',
+            response_model=List[DailySalesOut],
+            status_code=status.HTTP_200_OK)
+async def get_daily_sales(period: tuple[date, date] = Depends(date_range),
+                          meal_id: UUID | None = None,
+                          db: AsyncSession = Depends(get_read_db)):
+    return await repository_analytics.get_daily_sales(db, *period, meal_id)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from src.services.health import readiness
+
+router = APIRouter(prefix="/health", tags=['health'])
+
+
+@router.get('/live', name='Liveness probe',
+            status_code=status.HTTP_200_OK)
+async def live():
+    # Touches no backing service: a failing database must not get the app restarted.
+    return {"status": "OK"}
+
+
+@router.get('/ready', name='Readiness probe',
+            status_code=status.HTTP_200_OK)
+async def ready():
+    result = await readiness.check()
+    status_code = status.HTTP_200_OK if result["status"] == "OK" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(result, status_code=status_code)
@@ -1,28 +1,36 @@
 from typing import List
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, status, File, UploadFile, APIRouter
-from sqlalchemy.orm import Session
+from fastapi import BackgroundTasks, Depends, HTTPException, status, File, UploadFile, APIRouter, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.config.messages import ERROR_UPLOAD_FILE, MEAL_NOT_FOUND, ERROR_DELETE_MEAL, PROHIBITED_FILE_CONTENT
+from src.config.config import settings
+from src.config.messages import (ERROR_UPLOAD_FILE, MEAL_NOT_FOUND, ERROR_DELETE_MEAL, PROHIBITED_FILE_CONTENT,
+                                 DIRECT_UPLOAD_UNAVAILABLE)
 from src.database.db import get_db
-from src.schemas.meals import CreateMealModel, Meal, UpdateMealModel
+from src.schemas.meals import (CompleteUploadModel, CreateMealModel, DirectUploadModel, Meal, UpdateMealModel,
+                              meal_adapter, meal_list_adapter)
 from src.repository import meals as repository_meals
-from src.services.files import update_file, delete_file
+from src.services.cache import MEAL, MEALS, menu_cache
+from src.services.etag import conditional_json
+from src.services.files import (complete_direct_upload, create_direct_upload, image_paths, release_images,
+                                 update_file)
+from src.services.pagination import NEXT_CURSOR_HEADER, PageParams, pack_page, page_params, unpack_page
+from src.services.storage import get_storage
 
 router = APIRouter(prefix="/meals", tags=['meals'])
 
 
 @router.post('/', name='Create new meal',
              status_code=status.HTTP_201_CREATED)
-async def create_meal(body: CreateMealModel, db: Session = Depends(get_db)):
+async def create_meal(body: CreateMealModel, db: AsyncSession = Depends(get_db)):
     meal = await repository_meals.add_meal(body, db)
     return meal
 
 
 @router.put('/', name='Update meal',
              status_code=status.HTTP_201_CREATED)
-async def update_meal(body: UpdateMealModel, db: Session = Depends(get_db)):
+async def update_meal(body: UpdateMealModel, db: AsyncSession = Depends(get_db)):
     meal = await repository_meals.get_meal(body.id, db)
     if meal is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
@@ -33,33 +41,57 @@ async def update_meal(body: UpdateMealModel, db: Session = Depends(get_db)):
 @router.get("/", name="Return all meals",
             response_model=List[Meal],
             status_code=status.HTTP_200_OK)
-async def get_all_meals(db: Session = Depends(get_db)):
-    return await repository_meals.get_meal_all(db) or []
+async def get_all_meals(request: Request,
+                        page: PageParams = Depends(page_params),
+                        db: AsyncSession = Depends(get_db)):
+    # Menu reads stay on the primary: they fill the shared menu cache, and a
+    # lagging replica would cache a stale menu for every client.
+    cache_key = f'{page.limit}:{page.cursor or ""}'
+    cached = await menu_cache.get(MEALS, cache_key)
+    if cached is None:
+        generation = await menu_cache.generation(MEALS)
+        meals = await repository_meals.get_meal_all(db, page.limit, page.cursor)
+        body = meal_list_adapter.dump_json(meal_list_adapter.validate_python(meals.items, from_attributes=True))
+        cached = pack_page(body, meals.next_cursor)
+        await menu_cache.set(MEALS, cache_key, cached, generation)
+    body, next_cursor = unpack_page(cached)
+    response = conditional_json(request, body, settings.cache_control_meal_list)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
 
 
 @router.get("/{id}", name="Return meal",
             response_model=Meal,
             status_code=status.HTTP_200_OK)
-async def get_meal_by_id(id: UUID, db: Session = Depends(get_db)):
-    meal = await repository_meals.get_meal(id, db)
-    if meal is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail=MEAL_NOT_FOUND.format(id=id))
-    return meal
+async def get_meal_by_id(id: UUID, request: Request, db: AsyncSession = Depends(get_db)):
+    body = await menu_cache.get(MEAL, str(id))
+    if body is None:
+        generation = await menu_cache.generation(MEAL)
+        meal = await repository_meals.get_meal(id, db)
+        if meal is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=MEAL_NOT_FOUND.format(meal_id=id))
+        body = meal_adapter.dump_json(meal_adapter.validate_python(meal, from_attributes=True))
+        await menu_cache.set(MEAL, str(id), body, generation)
+    return conditional_json(request, body, settings.cache_control_meal)
 
 
 @router.delete("/{id}", name="Delete meal",
                status_code=status.HTTP_204_NO_CONTENT)
-async def delete_meal_by_id(id: UUID, db: Session = Depends(get_db)):
+async def delete_meal_by_id(id: UUID, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
     meal = await repository_meals.get_meal(id, db)
     if meal is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail=MEAL_NOT_FOUND.format(id=id))
+                            detail=MEAL_NOT_FOUND.format(meal_id=id))
+    paths = image_paths(meal)
     try:
         await repository_meals.delete_meal(id, db)
-        await delete_file(meal.image)
     except Exception as e:
         raise HTTPException(status_code=500, detail=ERROR_DELETE_MEAL.format(id=id, error=str(e)))
+    # Images may be shared with other meals; only unreferenced ones are removed.
+    if paths:
+        background_tasks.add_task(release_images, paths)
     return None
 
 
@@ -68,7 +100,7 @@ async def delete_meal_by_id(id: UUID, db: Session = Depends(get_db)):
              status_code=status.HTTP_200_OK)
 async def upload_pics_meal(id: UUID,
                            file: UploadFile = File(...),
-                           db: Session = Depends(get_db)):
+                           db: AsyncSession = Depends(get_db)):
     if not file.content_type.startswith("image/"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -77,10 +109,48 @@ async def upload_pics_meal(id: UUID,
     meal = await repository_meals.get_meal(id, db)
     if meal is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail=MEAL_NOT_FOUND.format(id=id))
+                            detail=MEAL_NOT_FOUND.format(meal_id=id))
+    try:
+        file_name, image_variants = await update_file(file, meal)
+        meal = await repository_meals.set_file_name(meal.id, file_name, db, image_variants)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=ERROR_UPLOAD_FILE.format(error=str(e)))
+    return meal
+
+
+@router.post("/upload/{id}/presign", name="presign direct upload",
+             response_model=DirectUploadModel,
+             status_code=status.HTTP_200_OK)
+async def presign_upload_meal(id: UUID, content_type: str, db: AsyncSession = Depends(get_db)):
+    if not get_storage().supports_direct_upload:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=DIRECT_UPLOAD_UNAVAILABLE)
+    if not content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=PROHIBITED_FILE_CONTENT.format(content_type=content_type)
+        )
+    meal = await repository_meals.get_meal(id, db)
+    if meal is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=MEAL_NOT_FOUND.format(meal_id=id))
+    return await create_direct_upload(meal, content_type)
+
+
+@router.post("/upload/{id}/complete", name="complete direct upload",
+             response_model=Meal,
+             status_code=status.HTTP_200_OK)
+async def complete_upload_meal(id: UUID, body: CompleteUploadModel, db: AsyncSession = Depends(get_db)):
+    meal = await repository_meals.get_meal(id, db)
+    if meal is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=MEAL_NOT_FOUND.format(meal_id=id))
     try:
-        file_name = await update_file(file, meal)
-        meal = await repository_meals.set_file_name(meal.id, file_name, db)
+        file_name, image_variants = await complete_direct_upload(meal, body.key)
+        meal = await repository_meals.set_file_name(meal.id, file_name, db, image_variants)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=ERROR_UPLOAD_FILE.format(error=str(e)))
     return meal
@@ -1,12 +1,23 @@
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, List
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, status, APIRouter
-from sqlalchemy.orm import Session
+from fastapi import Body, Depends, Header, HTTPException, status, APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.config.config import settings
+from src.config.messages import BULK_ORDERS_TOO_MANY
 from src.database.db import get_db
-from src.schemas.orders import OrderCreate, OrderOut
+from src.database.replicas import get_read_db, read_session
+from src.schemas.orders import (BulkOrderOut, ExportFormat, OrderCreate, OrderOut, order_adapter,
+                                order_list_adapter)
 from src.repository import orders as repository_orders
+from src.services.pagination import PageParams, next_cursor_headers, page_params
+from src.services.etag import cache_headers, etag_matches, make_etag, not_modified
+from src.services.export import encode_csv, encode_ndjson, naive_utc
+from src.services.idempotency import fingerprint, idempotency_store
+from src.services.serialization import json_response
 
 router = APIRouter(prefix="/orders", tags=['orders'])
 
@@ -14,31 +25,97 @@ router = APIRouter(prefix="/orders", tags=['orders'])
 @router.post('/', name='Create new order',
              status_code=status.HTTP_201_CREATED,
              response_model=OrderOut)
-async def create_order(order: OrderCreate, db: Session = Depends(get_db)):
-    return await repository_orders.create_order(order, db)
+async def create_order(order: OrderCreate,
+                       idempotency_key: str | None = Header(None, alias='Idempotency-Key', max_length=255),
+                       db: AsyncSession = Depends(get_db)):
+    if idempotency_key is None:
+        order = await repository_orders.create_order(order, db)
+        return json_response(order_adapter, order, status_code=status.HTTP_201_CREATED)
+
+    request_fingerprint = fingerprint(order.model_dump_json(by_alias=True).encode())
+    stored = await idempotency_store.begin(idempotency_key, request_fingerprint)
+    if stored is not None:
+        return Response(content=stored.body, status_code=stored.status_code, media_type="application/json",
+                        headers={"Idempotent-Replayed": "true"})
+    try:
+        order = await repository_orders.create_order(order, db)
+    except Exception:
+        await idempotency_store.release(idempotency_key)
+        raise
+    response = json_response(order_adapter, order, status_code=status.HTTP_201_CREATED)
+    await idempotency_store.complete(idempotency_key, request_fingerprint, response.status_code, response.body)
+    return response
+
+
+@router.post('/bulk', name='Create orders in bulk',
+             status_code=status.HTTP_200_OK,
+             response_model=BulkOrderOut)
+async def create_orders_bulk(orders: List[Dict[str, Any]] = Body(...), db: AsyncSession = Depends(get_db)):
+    # Orders are validated one by one in the repository so a bad order fails alone.
+    if len(orders) > settings.bulk_orders_max:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=BULK_ORDERS_TOO_MANY.format(count=len(orders), limit=settings.bulk_orders_max))
+    results = await repository_orders.create_orders_bulk(orders, db)
+    created = sum(result.error is None for result in results)
+    return BulkOrderOut(created=created, failed=len(results) - created, results=results)
+
+
+@router.get('/export', name='Export orders',
+            status_code=status.HTTP_200_OK)
+async def export_orders(request: Request,
+                        format: ExportFormat = ExportFormat.ndjson,
+                        start: datetime | None = None,
+                        end: datetime | None = None):
+    # Converted before the response starts: a bad bound inside the stream would
+    # cut a 200 response short instead of failing it.
+    start, end = naive_utc(start), naive_utc(end)
+    encode, media_type = {
+        ExportFormat.ndjson: (encode_ndjson, "application/x-ndjson"),
+        ExportFormat.csv: (encode_csv, "text/csv"),
+    }[format]
+
+    # The stream outlives the request dependencies, so it owns its session.
+    async def body():
+        async with await read_session(request) as db:
+            rows = repository_orders.stream_orders_export(db, start, end, settings.export_batch_size)
+            async for chunk in encode(rows):
+                yield chunk
+
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"Content-Disposition": f"attachment; filename=orders.{format.value}"})
 
 
 @router.get('/{id}', name='Get order by id',
             status_code=status.HTTP_200_OK,
             response_model=OrderOut)
-async def get_order_by_id(id: UUID, db: Session = Depends(get_db)):
+async def get_order_by_id(id: UUID, request: Request, db: AsyncSession = Depends(get_read_db)):
+    version = await repository_orders.get_order_version(id, db)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    etag = make_etag('order', id, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.cache_control_order)
     order = await repository_orders.get_order_by_id(id, db)
     if order is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    return order
+    return json_response(order_adapter, order, headers=cache_headers(etag, settings.cache_control_order))
 
 
 @router.get('/customer/{search_term}', name='Get orders by customer info',
             status_code=status.HTTP_200_OK,
             response_model=List[OrderOut])
-async def get_order_by_customer_info_mask(search_term: str, db: Session = Depends(get_db)):
-    orders = await repository_orders.get_orders_by_customer_info_mask(search_term, db)
-    return orders or []
+async def get_order_by_customer_info_mask(search_term: str,
+                                          page: PageParams = Depends(page_params),
+                                          db: AsyncSession = Depends(get_read_db)):
+    orders = await repository_orders.get_orders_by_customer_info_mask(search_term, db, page.limit, page.cursor)
+    return json_response(order_list_adapter, orders.items, headers=next_cursor_headers(orders))
 
 
 @router.get('/meal/{meal_id}', name='Get orders by meal',
             status_code=status.HTTP_200_OK,
             response_model=List[OrderOut])
-async def get_order_by_customer_info_mask(meal_id: UUID, db: Session = Depends(get_db)):
-    orders = await repository_orders.get_orders_by_meal_id(meal_id, db)
-    return orders or []
+async def get_order_by_meal_id(meal_id: UUID,
+                               page: PageParams = Depends(page_params),
+                               db: AsyncSession = Depends(get_read_db)):
+    orders = await repository_orders.get_orders_by_meal_id(meal_id, db, page.limit, page.cursor)
+    return json_response(order_list_adapter, orders.items, headers=next_cursor_headers(orders))
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, status
+
+from src.database.db import engine
+from src.database.pool import pool_stats
+
+router = APIRouter(prefix="/system", tags=['system'])
+
+
+@router.get('/pool', name='Database pool status',
+            status_code=status.HTTP_200_OK)
+async def get_pool_status():
+    return pool_stats.snapshot(engine.pool)
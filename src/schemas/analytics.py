@@ -0,0 +1,30 @@
+from datetime import date
+from enum import Enum
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class TopMealsOrder(str, Enum):
+    revenue = "revenue"
+    quantity = "quantity"
+    order_count = "order_count"
+
+
+class MealSalesOut(BaseModel):
+    meal_id: UUID
+    name: str
+    order_count: int
+    quantity: int
+    revenue: float
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+class DailySalesOut(BaseModel):
+    day: date
+    order_count: int
+    quantity: int
+    revenue: float
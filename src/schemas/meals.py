@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field, constr
+from pydantic import BaseModel, Field, TypeAdapter, computed_field, constr
+
+from src.config.config import settings
 
 
 class CreateMealModel(BaseModel):
@@ -22,12 +24,18 @@ class UpdateMealModel(BaseModel):
     }
 
 
+class MealImages(BaseModel):
+    src: str
+    srcset: Dict[str, str]
+
+
 class Meal(BaseModel):
     id: UUID
     name: str
     price: float
     description: Optional[str] = None
     image: Optional[str] = None
+    image_variants: Optional[Dict[str, Dict[str, str]]] = Field(None, exclude=True)
     created_at: datetime
     updated_at: datetime
 
@@ -35,6 +43,36 @@ class Meal(BaseModel):
         "from_attributes": True
     }
 
+    @computed_field
+    @property
+    def images(self) -> Optional[MealImages]:
+        """URLs of the generated variants as ``srcset`` strings per format."""
+        if not self.image_variants:
+            return None
+        return MealImages(
+            src=f"{settings.storage_public_url}{self.image}",
+            srcset={
+                image_format: ", ".join(f"{settings.storage_public_url}{path} {width}w"
+                                        for width, path in sorted(paths.items(), key=lambda item: int(item[0])))
+                for image_format, paths in self.image_variants.items()
+            },
+        )
+
+
+class DirectUploadModel(BaseModel):
+    key: str
+    url: str
+    fields: Dict[str, str]
+    expires_in: int
+
+
+class CompleteUploadModel(BaseModel):
+    key: str
+
+
+meal_adapter = TypeAdapter(Meal)
+meal_list_adapter = TypeAdapter(List[Meal])
+
 
 class MealOrderItem(BaseModel):
     id: UUID
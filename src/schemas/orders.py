@@ -1,8 +1,9 @@
 from datetime import datetime
+from enum import Enum
 from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field, EmailStr, constr
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter, constr
 
 
 class OrderMealItems(BaseModel):
@@ -23,12 +24,14 @@ class OrderMealOut(BaseModel):
     }
 
 
+# Maximum lengths are those of the ``orders`` columns, so an order that validates
+# also fits, and a bulk import rejects a bad order alone instead of failing its INSERT.
 class OrderCreateCustomer(BaseModel):
-    name: constr(strip_whitespace=True, min_length=1)
-    email: EmailStr
-    street: constr(strip_whitespace=True, min_length=1)
-    city: constr(strip_whitespace=True, min_length=1)
-    postal_code: constr(strip_whitespace=True, min_length=1) = Field(..., alias="postal-code")
+    name: constr(strip_whitespace=True, min_length=1, max_length=200)
+    email: EmailStr = Field(..., max_length=255)
+    street: constr(strip_whitespace=True, min_length=1, max_length=200)
+    city: constr(strip_whitespace=True, min_length=1, max_length=150)
+    postal_code: constr(strip_whitespace=True, min_length=1, max_length=10) = Field(..., alias="postal-code")
 
 
 class OrderOutCustomer(BaseModel):
@@ -53,6 +56,7 @@ class OrderOut(BaseModel):
     id: UUID
     customer: OrderOutCustomer
     items: List[OrderMealOut]
+    total: float
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -60,3 +64,25 @@ class OrderOut(BaseModel):
         "from_attributes": True,
         "populate_by_name": True
     }
+
+
+class BulkOrderResult(BaseModel):
+    index: int
+    id: Optional[UUID] = None
+    created_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class BulkOrderOut(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkOrderResult]
+
+
+order_adapter = TypeAdapter(OrderOut)
+order_list_adapter = TypeAdapter(List[OrderOut])
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
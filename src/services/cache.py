@@ -0,0 +1,236 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, WatchError
+
+from src.config.config import settings
+from src.services.metrics import CACHE_REQUESTS
+from src.services.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+MEALS = 'meals'
+MEAL = 'meal'
+
+
+class LocalCache:
+    """Per-worker LRU of serialized responses keyed by ``(namespace, key)``."""
+
+    def __init__(self, max_items: int, ttl: float):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items: OrderedDict[tuple[str, str], tuple[bytes, float]] = OrderedDict()
+
+    def get(self, namespace: str, key: str) -> bytes | None:
+        item = self._items.get((namespace, key))
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._items[(namespace, key)]
+            return None
+        self._items.move_to_end((namespace, key))
+        return value
+
+    def set(self, namespace: str, key: str, value: bytes):
+        self._items[(namespace, key)] = (value, time.monotonic() + self.ttl)
+        self._items.move_to_end((namespace, key))
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def delete(self, namespace: str, key: str | None = None):
+        if key is not None:
+            self._items.pop((namespace, key), None)
+            return
+        for item_key in [item_key for item_key in self._items if item_key[0] == namespace]:
+            del self._items[item_key]
+
+    def clear(self):
+        self._items.clear()
+
+
+class MenuCache:
+    """Two-tier cache for serialized menu responses.
+
+    Lookups go to the worker's ``LocalCache`` first and then to Redis, where each
+    namespace is a hash so a whole namespace can be dropped with one ``DEL``.
+    Invalidations are published on a channel so every worker clears its local
+    copy. When Redis is unreachable the cache degrades to the local tier and
+    retries Redis after ``RETRY_AFTER`` seconds.
+
+    Every invalidation also bumps a per-namespace generation, locally and in
+    Redis. A miss takes ``generation()`` before reading the database and passes
+    it to ``set``, which stores nothing when an invalidation happened in
+    between: otherwise a response read before a write could be cached after
+    the write's invalidation, for the full TTL and in every worker.
+    """
+
+    CHANNEL = 'menu:invalidate'
+    RETRY_AFTER = 5
+
+    def __init__(self, redis_factory: Callable[[], Redis] = get_redis,
+                 enabled: bool = settings.menu_cache_enabled,
+                 ttl: int = settings.menu_cache_ttl,
+                 local_ttl: int = settings.menu_cache_local_ttl,
+                 max_items: int = settings.menu_cache_max_items):
+        self.redis_factory = redis_factory
+        self.enabled = enabled
+        self.ttl = ttl
+        self.local = LocalCache(max_items, local_ttl)
+        self._generations: dict[str, int] = {}
+        self._redis_down_until = 0.0
+
+    @staticmethod
+    def _redis_key(namespace: str) -> str:
+        return f'menu:{namespace}'
+
+    @staticmethod
+    def _generation_key(namespace: str) -> str:
+        return f'menu:{namespace}:generation'
+
+    def _bump_local(self, namespaces):
+        for namespace in namespaces:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, error: Exception):
+        logger.warning("Menu cache: Redis unavailable: %s", error)
+        self._redis_down_until = time.monotonic() + self.RETRY_AFTER
+
+    async def get(self, namespace: str, key: str) -> bytes | None:
+        if not self.enabled:
+            return None
+        value = self.local.get(namespace, key)
+        if value is not None:
+            CACHE_REQUESTS.labels(namespace, 'local_hit').inc()
+            return value
+        if not self._redis_available():
+            CACHE_REQUESTS.labels(namespace, 'miss').inc()
+            return None
+        try:
+            value = await self.redis_factory().hget(self._redis_key(namespace), key)
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+            CACHE_REQUESTS.labels(namespace, 'miss').inc()
+            return None
+        if value is not None:
+            CACHE_REQUESTS.labels(namespace, 'redis_hit').inc()
+            self.local.set(namespace, key, value)
+        else:
+            CACHE_REQUESTS.labels(namespace, 'miss').inc()
+        return value
+
+    async def generation(self, namespace: str) -> tuple[int, bytes | None]:
+        """Token for a later ``set``; take it before reading what will be cached."""
+        local = self._generations.get(namespace, 0)
+        if not self.enabled or not self._redis_available():
+            return local, None
+        try:
+            return local, await self.redis_factory().get(self._generation_key(namespace)) or b'0'
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+            return local, None
+
+    async def set(self, namespace: str, key: str, value: bytes, generation: tuple[int, bytes | None]):
+        """Store ``value`` unless ``namespace`` was invalidated since ``generation`` was taken."""
+        if not self.enabled:
+            return
+        local, shared = generation
+        if self._generations.get(namespace, 0) != local:
+            return
+        if shared is not None and self._redis_available():
+            try:
+                async with self.redis_factory().pipeline(transaction=True) as pipe:
+                    # WATCH fails the write if another worker invalidates in the meantime.
+                    await pipe.watch(self._generation_key(namespace))
+                    if (await pipe.get(self._generation_key(namespace)) or b'0') != shared:
+                        return
+                    pipe.multi()
+                    pipe.hset(self._redis_key(namespace), key, value)
+                    pipe.expire(self._redis_key(namespace), self.ttl)
+                    await pipe.execute()
+            except WatchError:
+                return
+            except (RedisError, OSError) as e:
+                self._redis_failed(e)
+        if self._generations.get(namespace, 0) == local:
+            self.local.set(namespace, key, value)
+
+    async def invalidate(self, *entries: tuple[str, str | None]):
+        """Drop ``(namespace, key)`` entries everywhere; a ``None`` key drops the namespace."""
+        if not self.enabled:
+            return
+        namespaces = {namespace for namespace, _ in entries}
+        self._bump_local(namespaces)
+        for namespace, key in entries:
+            self.local.delete(namespace, key)
+        try:
+            async with self.redis_factory().pipeline(transaction=False) as pipe:
+                # Generations first: a fill that has not written yet now fails.
+                for namespace in sorted(namespaces):
+                    pipe.incr(self._generation_key(namespace))
+                for namespace, key in entries:
+                    if key is None:
+                        pipe.delete(self._redis_key(namespace))
+                    else:
+                        pipe.hdel(self._redis_key(namespace), key)
+                pipe.publish(self.CHANNEL, json.dumps(entries))
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+
+    def _clear_local(self):
+        self._bump_local({MEALS, MEAL, *self._generations})
+        self.local.clear()
+
+    async def invalidate_meal(self, id):
+        await self.invalidate((MEALS, None), (MEAL, str(id)))
+
+    async def listen(self):
+        """Drop local entries invalidated by other workers until cancelled.
+
+        Invalidations published while the subscription is down are lost, so the
+        local tier is cleared when it drops and again once resubscribed. Entries
+        cached during an outage can therefore be stale for up to ``local_ttl``
+        seconds. The outage is logged once, however many retries it takes.
+        """
+        if not self.enabled:
+            return
+        connected = True
+        while True:
+            try:
+                async with self.redis_factory().pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.CHANNEL)
+                    # Messages may have been missed while disconnected.
+                    self._clear_local()
+                    if not connected:
+                        logger.info("Menu cache listener reconnected")
+                        connected = True
+                    while True:
+                        message = await pubsub.get_message(timeout=1.0)
+                        if message is None:
+                            continue
+                        entries = json.loads(message['data'])
+                        self._bump_local({namespace for namespace, _ in entries})
+                        for namespace, key in entries:
+                            self.local.delete(namespace, key)
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError, ValueError) as e:
+                if connected:
+                    logger.warning("Menu cache listener disconnected: %s; retrying every %s s", e, self.RETRY_AFTER)
+                    self._clear_local()
+                    connected = False
+                else:
+                    logger.debug("Menu cache listener still disconnected: %s", e)
+                await asyncio.sleep(self.RETRY_AFTER)
+
+
+menu_cache = MenuCache()
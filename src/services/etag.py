@@ -0,0 +1,40 @@
+from hashlib import blake2b
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from version fields such as an id and ``updated_at``."""
+    return content_etag('\x1f'.join(str(part) for part in parts).encode())
+
+
+def content_etag(body: bytes) -> str:
+    return f'"{blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """``If-None-Match`` uses the weak comparison, so ``W/`` prefixes are ignored."""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, cache_control))
+
+
+def conditional_json(request: Request, body: bytes, cache_control: str) -> Response:
+    """Answer with 304 when the client already holds ``body``, otherwise send it with its ETag."""
+    etag = content_etag(body)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag, cache_control))
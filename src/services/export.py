@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import AsyncIterator
+
+CHUNK_SIZE = 64 * 1024
+
+CSV_COLUMNS = ['order_id', 'created_at', 'updated_at', 'customer_name', 'customer_email', 'customer_street',
+               'customer_city', 'customer_postal_code', 'order_total', 'meal_id', 'meal_name', 'price', 'quantity']
+
+
+def naive_utc(value: datetime | None) -> datetime | None:
+    """``orders.created_at`` is a naive UTC timestamp; asyncpg refuses to compare it with an aware value."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+async def _chunked(lines: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Join small lines into ~64 KB chunks so each ASGI send carries a useful payload."""
+    buffer = []
+    size = 0
+    async for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode()
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+async def _ndjson_lines(rows) -> AsyncIterator[str]:
+    # Rows arrive ordered by order, so an order is complete once the id changes.
+    order = None
+    async for row in rows:
+        if order is None or order['id'] != row.id:
+            if order is not None:
+                yield json.dumps(order, default=_json_default) + '\n'
+            order = {
+                "id": row.id,
+                "customer": {
+                    "name": row.customer_name,
+                    "email": row.customer_email,
+                    "street": row.customer_street,
+                    "city": row.customer_city,
+                    "postal-code": row.customer_postal_code,
+                },
+                "items": [],
+                "total": row.total,
+                "created_at": row.created_at,
+                "updated_at": row.updated_at,
+            }
+        if row.meal_id is not None:
+            order["items"].append({
+                "id": row.meal_id,
+                "name": row.meal_name,
+                "price": row.price,
+                "quantity": row.quantity,
+            })
+    if order is not None:
+        yield json.dumps(order, default=_json_default) + '\n'
+
+
+async def _csv_lines(rows) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    async for row in rows:
+        writer.writerow([row.id, row.created_at.isoformat(), row.updated_at.isoformat() if row.updated_at else '',
+                         row.customer_name, row.customer_email, row.customer_street, row.customer_city,
+                         row.customer_postal_code, row.total, row.meal_id or '', row.meal_name or '',
+                         row.price if row.price is not None else '', row.quantity or ''])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def encode_ndjson(rows) -> AsyncIterator[bytes]:
+    return _chunked(_ndjson_lines(rows))
+
+
+def encode_csv(rows) -> AsyncIterator[bytes]:
+    return _chunked(_csv_lines(rows))
@@ -1,35 +1,279 @@
-import aiofiles
+import hashlib
+import logging
 import os
 import asyncio
+import shutil
+import tempfile
+import time
 from pathlib import Path
-from fastapi import UploadFile, HTTPException
-from src.config.messages import ERROR_UPLOAD_FILE
-from src.config.constants import STATIC_DIR, ADD_IMAGE_DIR
+from uuid import uuid4
 
+from fastapi import UploadFile, HTTPException, status
+from PIL import Image, UnidentifiedImageError
+from src.config.config import settings
+from src.config.messages import (ERROR_UPLOAD_FILE, FILE_TOO_LARGE, IMAGE_TOO_LARGE, INVALID_UPLOAD_KEY, NOT_AN_IMAGE,
+                                 UPLOAD_NOT_FOUND)
+from src.config.constants import ADD_IMAGE_DIR, DIRECT_UPLOAD_DIR
+from src.database.db import SessionLocal
+from src.repository import meals as repository_meals
+from src.services.images import (CONTENT_TYPES, HASHED_IMAGE, MAX_IMAGE_PIXELS, image_key, output_formats, process_image,
+                                 variant_paths)
+from src.services.metrics import UPLOAD_BYTES
+from src.services.storage import get_storage
 
-async def delete_file(file_name: str):
-    file_path = Path(f"{STATIC_DIR}{file_name}")
+logger = logging.getLogger(__name__)
 
-    if file_path.exists():
-        await asyncio.to_thread(os.remove, file_path)
-    return 0
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                         detail=FILE_TOO_LARGE.format(limit=settings.upload_max_bytes))
+
+
+def _disk_fileno(source) -> int | None:
+    """File descriptor of an upload that already lives on disk, or None for in-memory spools."""
+    if getattr(source, '_rolled', True) is False:
+        return None
+    try:
+        return source.fileno()
+    except (OSError, AttributeError):
+        return None
+
+
+def _copy_upload(source, target, max_size: int, chunk_size: int) -> tuple[int, str]:
+    source.seek(0)
+    source_fileno = _disk_fileno(source)
+    if source_fileno is not None:
+        # The spool was rolled over to a temporary file: hash it with C-level
+        # reads and copy it in the kernel.
+        size = os.fstat(source_fileno).st_size
+        if size > max_size:
+            raise _too_large()
+        with open(source_fileno, 'rb', closefd=False) as reader:
+            digest = hashlib.file_digest(reader, 'sha256').hexdigest()
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(target.fileno(), source_fileno, offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+        return offset, digest
+
+    size = 0
+    digest = hashlib.sha256()
+    while chunk := source.read(chunk_size):
+        size += len(chunk)
+        if size > max_size:
+            raise _too_large()
+        digest.update(chunk)
+        target.write(chunk)
+    return size, digest.hexdigest()
+
+
+def write_upload(source, file_path: Path, max_size: int, chunk_size: int) -> tuple[int, str]:
+    """Write ``source`` to ``file_path`` atomically, enforcing ``max_size`` while copying.
+
+    Returns the size and the SHA-256 hex digest of the data.
+
+    Blocking: call it through ``asyncio.to_thread`` so the whole copy costs a single
+    thread hop. The data goes to a temporary name first and is moved into place
+    with ``os.replace``, so readers see either the old file or the complete new one.
+    """
+    temp_path = file_path.with_name(f".{file_path.name}.{uuid4().hex}.tmp")
+    try:
+        with open(temp_path, 'wb') as target:
+            size, digest = _copy_upload(source, target, max_size, chunk_size)
+        os.replace(temp_path, file_path)
+        return size, digest
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _temp_path(meal, suffix: str) -> Path:
+    return Path(tempfile.gettempdir()) / f"meal-{meal.id}-{uuid4().hex}-upload{suffix}"
+
+
+def _file_sha256(file_path: Path) -> str:
+    with open(file_path, 'rb') as reader:
+        return hashlib.file_digest(reader, 'sha256').hexdigest()
+
+
+async def _render(source_path: Path, key: str, formats: list[str], output_dir: str | None):
+    """``process_image`` answering files Pillow cannot decode with 415 and oversized images with 413."""
+    try:
+        return await process_image(str(source_path), key, formats, output_dir)
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=NOT_AN_IMAGE)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=IMAGE_TOO_LARGE.format(limit=MAX_IMAGE_PIXELS))
+
+
+async def store_image(source_path: Path, digest: str) -> tuple[str, dict[str, dict[str, str]]]:
+    """Render the variants of a local image and save them to storage; returns ``(image, image_variants)``.
+
+    Variants are content-addressed, so identical uploads share objects and nothing
+    is overwritten or deleted here; when they are all stored already only their
+    widths are read and the objects are touched for the garbage collector.
+    ``image`` is the largest JPEG, kept for clients that only read that field.
+    """
+    storage = get_storage()
+    key = image_key(digest)
+    formats = output_formats()
+    paths = variant_paths(key, formats)
+
+    stored = await asyncio.gather(*(storage.stat(path) for path in paths.values()))
+    if all(stored):
+        variants, _ = await _render(source_path, key, formats, None)
+        await asyncio.gather(*(storage.touch(path) for path in paths.values()))
+    else:
+        output_dir = await asyncio.to_thread(tempfile.mkdtemp, prefix='meal-image-')
+        try:
+            variants, files = await _render(source_path, key, formats, output_dir)
+            await asyncio.gather(*(
+                storage.save_file(path, files[path], CONTENT_TYPES[image_format],
+                                  settings.static_immutable_cache_control)
+                for (_, image_format), path in paths.items()
+            ))
+        finally:
+            await asyncio.to_thread(shutil.rmtree, output_dir, True)
+
+    image = max(variants['jpeg'].items(), key=lambda item: int(item[0]))[1]
+    return image, variants
 
 
 async def update_file(file: UploadFile, meal):
-    ext = Path(file.filename).suffix
-    new_filename = f"{ADD_IMAGE_DIR}{meal.id}{ext}"
-    new_filepath = f"{STATIC_DIR}{new_filename}"
+    """Store an upload received by the API; returns ``(image, image_variants)``."""
+    if file.size is not None and file.size > settings.upload_max_bytes:
+        raise _too_large()
 
+    upload_path = _temp_path(meal, Path(file.filename).suffix)
     try:
-        await delete_file(new_filename)
+        size, digest = await asyncio.to_thread(write_upload, file.file, upload_path,
+                                               settings.upload_max_bytes, settings.upload_chunk_size)
+        UPLOAD_BYTES.labels('api').inc(size)
+        return await store_image(upload_path, digest)
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=ERROR_UPLOAD_FILE.format(error=str(e)))
+
+    finally:
+        await asyncio.to_thread(upload_path.unlink, missing_ok=True)
+
+
+async def create_direct_upload(meal, content_type: str) -> dict:
+    """Presigned form that lets the client send an image straight to storage.
+
+    The client POSTs the file to ``url`` with ``fields`` and then calls
+    ``complete_direct_upload`` with ``key``. Raises ``DirectUploadUnsupported`` when
+    the storage backend cannot accept direct uploads.
+    """
+    key = f"{DIRECT_UPLOAD_DIR}{meal.id}/{uuid4().hex}"
+    form = await get_storage().presigned_upload(key, content_type, settings.upload_max_bytes,
+                                                settings.presigned_upload_ttl)
+    return {'key': key, 'url': form['url'], 'fields': form['fields'], 'expires_in': settings.presigned_upload_ttl}
 
-        file_path = Path(new_filepath)
 
-        async with aiofiles.open(file_path, 'wb') as f:
-            while chunk := await file.read(1024):
-                await f.write(chunk)
+async def complete_direct_upload(meal, key: str):
+    """Render the variants of a direct upload; returns ``(image, image_variants)``.
 
-        return new_filename
+    The original is streamed from storage to a temporary file for the image
+    workers and deleted from storage once the variants are saved.
+    """
+    if not key.startswith(f"{DIRECT_UPLOAD_DIR}{meal.id}/") or '..' in key:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_UPLOAD_KEY)
+
+    storage = get_storage()
+    stored = await storage.stat(key)
+    if stored is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=UPLOAD_NOT_FOUND)
+    if stored.size > settings.upload_max_bytes:
+        await storage.delete(key)
+        raise _too_large()
+
+    upload_path = _temp_path(meal, '')
+    try:
+        await storage.download(key, str(upload_path))
+        UPLOAD_BYTES.labels('direct').inc(stored.size)
+        digest = await asyncio.to_thread(_file_sha256, upload_path)
+        result = await store_image(upload_path, digest)
+
+    except HTTPException:
+        raise
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=ERROR_UPLOAD_FILE.format(error=str(e)))
+
+    finally:
+        await asyncio.to_thread(upload_path.unlink, missing_ok=True)
+
+    await storage.delete(key)
+    return result
+
+
+def image_paths(meal) -> set[str]:
+    paths = {meal.image} if meal.image else set()
+    for variant_paths in (meal.image_variants or {}).values():
+        paths.update(variant_paths.values())
+    return paths
+
+
+def _is_garbage(path: str, referenced: set[str]) -> bool:
+    if HASHED_IMAGE.search(path):
+        return path not in referenced
+    # Hidden names are temporary files and upload leftovers.
+    return path.rsplit('/', 1)[-1].startswith('.')
+
+
+async def release_images(paths: set[str], grace: float = settings.image_gc_grace) -> int:
+    """Delete ``paths`` from storage unless a meal still references them.
+
+    Objects younger than ``grace`` seconds are left to the image GC: an upload of
+    the same picture may be about to reference them.
+    """
+    storage = get_storage()
+    async with SessionLocal() as db:
+        referenced = await repository_meals.get_image_paths(db)
+    cutoff = time.time() - grace
+    removed = 0
+    for path in paths - referenced:
+        stored = await storage.stat(path)
+        if stored is not None and stored.modified < cutoff:
+            await storage.delete(path)
+            removed += 1
+    return removed
+
+
+async def collect_unreferenced_images(grace: float = settings.image_gc_grace) -> int:
+    """Delete generated images, temporary files and direct uploads no meal references.
+
+    Objects younger than ``grace`` seconds are kept: they may belong to an upload
+    whose meal row is not committed yet.
+    """
+    storage = get_storage()
+    async with SessionLocal() as db:
+        referenced = await repository_meals.get_image_paths(db)
+    cutoff = time.time() - grace
+    removed = 0
+    async for stored in storage.list(ADD_IMAGE_DIR):
+        if stored.modified < cutoff and _is_garbage(stored.path, referenced):
+            await storage.delete(stored.path)
+            removed += 1
+    async for stored in storage.list(DIRECT_UPLOAD_DIR):
+        if stored.modified < cutoff:
+            await storage.delete(stored.path)
+            removed += 1
+    return removed
+
+
+async def image_gc_loop(interval: float = settings.image_gc_interval):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await collect_unreferenced_images()
+            logger.info("Image GC removed %d files", removed)
+        except Exception as e:
+            logger.warning("Image GC failed: %s", e)
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from src.config.config import settings
+from src.database.db import engine
+from src.database.pool import pool_stats
+from src.database.replicas import replicas
+from src.services.redis import get_redis
+
+
+class ReadinessProbe:
+    """Checks the database and Redis at most once per ``ttl`` seconds per worker.
+
+    Concurrent callers wait for the probe already in flight and every caller
+    within ``ttl`` gets the cached result, so frequent orchestrator probes cost
+    one pooled connection per interval instead of a session per request. Each
+    check has a real async timeout: a hung server fails the probe instead of
+    hanging it.
+    """
+
+    def __init__(self, ttl: float, timeout: float):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._result: dict | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < self.ttl
+
+    async def _run(self, check) -> dict:
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                await check()
+            status = "OK"
+            error = None
+        except TimeoutError:
+            status = "FAIL"
+            error = f"timed out after {self.timeout}s"
+        except Exception as e:
+            status = "FAIL"
+            error = str(e)
+        result = {"status": status, "latency_ms": round((time.perf_counter() - started) * 1000, 3)}
+        if error:
+            result["error"] = error
+        return result
+
+    @staticmethod
+    async def _check_database():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    @staticmethod
+    async def _check_redis():
+        await get_redis().ping()
+
+    async def check(self) -> dict:
+        if self._fresh():
+            return self._result
+        async with self._lock:
+            if not self._fresh():
+                database, redis = await asyncio.gather(self._run(self._check_database),
+                                                       self._run(self._check_redis))
+                # Redis only backs caches that fail open, so it is reported but
+                # only required when configured so.
+                ready = database["status"] == "OK" and (redis["status"] == "OK" or not settings.health_require_redis)
+                self._result = {
+                    "status": "OK" if ready else "FAIL",
+                    "checks": {"database": database, "redis": redis},
+                    "pool": pool_stats.snapshot(engine.pool),
+                    # Reads fall back to the primary, so replicas never fail the probe.
+                    "replicas": replicas.snapshot(),
+                }
+                self._checked_at = time.monotonic()
+        return self._result
+
+
+readiness = ReadinessProbe(settings.health_cache_ttl, settings.health_timeout)
@@ -0,0 +1,89 @@
+import json
+import logging
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Callable
+
+from fastapi import HTTPException, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.config.config import settings
+from src.config.messages import IDEMPOTENCY_IN_PROGRESS, IDEMPOTENCY_KEY_REUSED
+from src.services.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    body: bytes
+
+
+def fingerprint(body: bytes) -> str:
+    return blake2b(body, digest_size=16).hexdigest()
+
+
+class IdempotencyStore:
+    """Redis-backed record of responses per ``Idempotency-Key``.
+
+    ``begin`` claims a key with ``SET NX``, so of several concurrent requests with
+    the same key exactly one proceeds; the others get 409 until it completes and
+    then receive the stored response. The pending claim expires after
+    ``lock_ttl`` seconds in case the worker dies mid-request. If Redis is down
+    requests proceed without deduplication rather than failing.
+    """
+
+    PREFIX = 'idempotency:'
+
+    def __init__(self, redis_factory: Callable[[], Redis] = get_redis,
+                 ttl: int = settings.idempotency_ttl,
+                 lock_ttl: int = settings.idempotency_lock_ttl):
+        self.redis_factory = redis_factory
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+
+    async def begin(self, key: str, request_fingerprint: str) -> StoredResponse | None:
+        """Return the stored response for a repeat, or None when the caller should process the request."""
+        redis_key = self.PREFIX + key
+        pending = json.dumps({"state": PENDING, "fingerprint": request_fingerprint})
+        try:
+            redis = self.redis_factory()
+            if await redis.set(redis_key, pending, nx=True, ex=self.lock_ttl):
+                return None
+            stored = await redis.get(redis_key)
+        except (RedisError, OSError) as e:
+            logger.warning("Idempotency store unavailable, processing without deduplication: %s", e)
+            return None
+        if stored is None:
+            # The previous claim expired between SET and GET; treat it as a fresh request.
+            return await self.begin(key, request_fingerprint)
+
+        record = json.loads(stored)
+        if record["fingerprint"] != request_fingerprint:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=IDEMPOTENCY_KEY_REUSED)
+        if record["state"] == PENDING:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=IDEMPOTENCY_IN_PROGRESS)
+        return StoredResponse(status_code=record["status_code"], body=record["body"].encode())
+
+    async def complete(self, key: str, request_fingerprint: str, status_code: int, body: bytes):
+        record = json.dumps({"state": DONE, "fingerprint": request_fingerprint,
+                             "status_code": status_code, "body": body.decode()})
+        try:
+            await self.redis_factory().set(self.PREFIX + key, record, ex=self.ttl)
+        except (RedisError, OSError) as e:
+            logger.warning("Idempotency store unavailable, response not recorded: %s", e)
+
+    async def release(self, key: str):
+        """Drop a pending claim after a failed request so the client can retry."""
+        try:
+            await self.redis_factory().delete(self.PREFIX + key)
+        except (RedisError, OSError) as e:
+            logger.warning("Idempotency store unavailable, claim left to expire: %s", e)
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import re
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
+
+from PIL import ExifTags, Image, ImageOps
+
+from src.config.config import settings
+from src.config.constants import ADD_IMAGE_DIR, IMAGE_VARIANTS
+
+# Format name -> (file extension, Pillow save options).
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+    'avif': ('avif', {'format': 'AVIF', 'quality': 60}),
+}
+CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg', 'avif': 'image/avif'}
+MAX_IMAGE_PIXELS = 50_000_000
+# Storage path of a content-addressed variant, see variant_paths.
+HASHED_IMAGE = re.compile(r'images/[0-9a-f]{2}/[0-9a-f]{32}-[a-z]+\.[a-z]+$')
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def output_formats() -> list[str]:
+    return ['webp', 'jpeg', 'avif'] if settings.image_avif else ['webp', 'jpeg']
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """JPEG has no alpha channel, so transparent images are composed onto white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def image_key(source_digest: str) -> str:
+    """Name of an upload's variants.
+
+    Mixes the source hash with the pipeline settings, so a given path always holds
+    the same bytes and can be cached forever; changing sizes or encoder options
+    produces new names instead of rewriting old files.
+    """
+    signature = repr((source_digest, IMAGE_VARIANTS, FORMATS))
+    return blake2b(signature.encode(), digest_size=16).hexdigest()
+
+
+def _variant_widths(source: Image.Image) -> dict[str, int]:
+    """Output widths read from the header only, honouring EXIF rotation."""
+    width, height = source.size
+    if source.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+        width, height = height, width
+    return {variant: min(width, target) for variant, target in IMAGE_VARIANTS.items()}
+
+
+def variant_paths(key: str, formats: list[str]) -> dict[tuple[str, str], str]:
+    """Storage path of every ``(variant, format)`` of ``key``: ``images/<key[:2]>/<key>-<variant>.<ext>``."""
+    directory = f"{ADD_IMAGE_DIR}{key[:2]}/"
+    return {
+        (variant, image_format): f"{directory}{key}-{variant}.{FORMATS[image_format][0]}"
+        for variant in IMAGE_VARIANTS
+        for image_format in formats
+    }
+
+
+def render_variants(source_path: str, key: str, formats: list[str],
+                    output_dir: str | None) -> tuple[dict[str, dict[str, str]], dict[str, str]]:
+    """Render every size/format variant of ``source_path`` into ``output_dir``.
+
+    Runs in a worker process. Returns ``{format: {width: storage_path}}`` and the
+    local file written for each storage path. With ``output_dir=None`` only the
+    header is read, which is enough when the variants are already stored.
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    # Pillow only warns up to twice MAX_IMAGE_PIXELS; refuse those images as well.
+    warnings.simplefilter('error', Image.DecompressionBombWarning)
+    paths = variant_paths(key, formats)
+    files = {}
+
+    with Image.open(source_path) as source:
+        widths = _variant_widths(source)
+        if output_dir is not None:
+            image = _flatten(ImageOps.exif_transpose(source))
+            for variant in IMAGE_VARIANTS:
+                width = widths[variant]
+                resized = image
+                if image.width > width:
+                    resized = image.resize((width, round(image.height * width / image.width)),
+                                           Image.Resampling.LANCZOS)
+                for image_format in formats:
+                    path = paths[(variant, image_format)]
+                    file_path = os.path.join(output_dir, os.path.basename(path))
+                    resized.save(file_path, **FORMATS[image_format][1])
+                    files[path] = file_path
+
+    variants = {image_format: {} for image_format in formats}
+    for (variant, image_format), path in paths.items():
+        variants[image_format][str(widths[variant])] = path
+    return variants, files
+
+
+def start_image_workers():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.image_workers)
+
+
+def shutdown_image_workers():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+async def process_image(source_path: str, key: str, formats: list[str],
+                        output_dir: str | None) -> tuple[dict[str, dict[str, str]], dict[str, str]]:
+    """Run ``render_variants`` in the process pool so decoding and encoding never block the event loop."""
+    start_image_workers()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, render_variants, source_path, key, formats, output_dir)
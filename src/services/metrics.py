@@ -0,0 +1,87 @@
+"""Prometheus metrics.
+
+With several uvicorn workers each process has its own counters. Set
+``PROMETHEUS_MULTIPROC_DIR`` to an empty, writable directory before starting
+the server (and clear it on every restart): values are then written to files
+there and ``/metrics`` merges all workers, whichever one serves the scrape.
+"""
+import os
+import time
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+REQUESTS = Counter('http_requests_total', 'HTTP requests by route template and status code.',
+                   ['method', 'route', 'status'])
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request latency by route template.',
+                             ['method', 'route'], buckets=LATENCY_BUCKETS)
+
+DB_QUERIES = Counter('db_queries_total', 'SQL statements by repository function.', ['function'])
+DB_QUERY_DURATION = Histogram('db_query_duration_seconds', 'SQL statement latency by repository function.',
+                              ['function'], buckets=QUERY_BUCKETS)
+DB_POOL_WAIT = Histogram('db_pool_wait_seconds', 'Time spent waiting for a pooled connection.',
+                         buckets=QUERY_BUCKETS)
+DB_POOL_TIMEOUTS = Counter('db_pool_timeouts_total', 'Connection checkouts that hit the pool timeout.')
+DB_POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections currently checked out, summed over workers.',
+                            multiprocess_mode='livesum')
+DB_POOL_CAPACITY = Gauge('db_pool_capacity', 'pool_size + max_overflow, summed over workers.',
+                         multiprocess_mode='livesum')
+
+CACHE_REQUESTS = Counter('menu_cache_requests_total', 'Menu cache lookups by tier that answered.',
+                         ['namespace', 'result'])
+UPLOAD_BYTES = Counter('upload_bytes_total', 'Bytes of meal images received.', ['source'])
+OUTBOX_EVENTS = Counter('outbox_events_total', 'Order events sent downstream, or failed attempts.', ['result'])
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the shared files when it exits."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """Counts requests and measures their latency per route template.
+
+    Routes are labelled with their path template (``/api/meals/{id}``), never
+    the raw path, so ids do not create new series. Requests that match no API
+    route, static files included, share the ``<other>`` label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get('route'), 'path', '<other>')
+            method = scope['method']
+            REQUESTS.labels(method, route, str(status_code)).inc()
+            REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - started)
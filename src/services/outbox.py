@@ -0,0 +1,172 @@
+"""Delivery of the order event outbox to downstream consumers.
+
+``create_order`` and the bulk import write an ``order.created`` row to
+``order_events`` in the same transaction as the order, so the request never
+waits for kitchen displays, notifications or email. ``outbox_loop`` runs in
+every worker, claims due events in batches with ``FOR UPDATE SKIP LOCKED`` and
+sends them to the configured sink:
+
+* ``redis``: one ``XADD`` per event to the ``outbox_stream`` stream, trimmed to
+  about ``outbox_stream_maxlen`` entries. Consumers read it with consumer
+  groups, e.g. ``XREADGROUP GROUP kitchen display-1 STREAMS orders:events >``.
+* ``webhook``: one ``POST`` of the batch as a JSON array to ``outbox_webhook_url``.
+
+A failed batch is retried with exponential backoff; after ``outbox_max_attempts``
+the events stay in the table with their ``last_error`` and are no longer sent.
+Delivery is at least once, so consumers deduplicate on the event ``id``.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import timedelta
+
+import httpx
+
+from src.config.config import settings
+from src.database.db import SessionLocal
+from src.database.models import OrderEvent
+from src.repository.outbox import claim_events, mark_dispatched, mark_failed, purge_dispatched
+from src.services.metrics import OUTBOX_EVENTS
+from src.services.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def event_message(event: OrderEvent) -> dict:
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "order_id": str(event.order_id),
+        "created_at": event.created_at.isoformat(),
+        "data": event.payload,
+    }
+
+
+class RedisStreamSink:
+    def __init__(self, stream: str, maxlen: int):
+        self.stream = stream
+        self.maxlen = maxlen
+
+    async def send(self, events: list[OrderEvent]):
+        async with get_redis().pipeline(transaction=False) as pipeline:
+            for event in events:
+                message = event_message(event)
+                pipeline.xadd(self.stream, {
+                    "id": message["id"],
+                    "type": message["type"],
+                    "order_id": message["order_id"],
+                    "payload": json.dumps(message),
+                }, maxlen=self.maxlen, approximate=True)
+            await pipeline.execute()
+
+    async def close(self):
+        pass
+
+
+class WebhookSink:
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    async def send(self, events: list[OrderEvent]):
+        response = await self.client.post(self.url, json=[event_message(event) for event in events])
+        response.raise_for_status()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def make_sink():
+    if settings.outbox_sink == 'redis':
+        return RedisStreamSink(settings.outbox_stream, settings.outbox_stream_maxlen)
+    if settings.outbox_sink == 'webhook':
+        if not settings.outbox_webhook_url:
+            raise ValueError("OUTBOX_WEBHOOK_URL is required for the webhook outbox sink")
+        return WebhookSink(settings.outbox_webhook_url, settings.outbox_webhook_timeout)
+    raise ValueError(f"Unknown outbox sink: {settings.outbox_sink}")
+
+
+class OutboxDispatcher:
+    def __init__(self, sink, batch_size: int):
+        self.sink = sink
+        self.batch_size = batch_size
+        self._wakeup = asyncio.Event()
+        self._purged_at = 0.0
+
+    def wake(self):
+        """Dispatch now instead of at the next poll, e.g. after an order commits."""
+        self._wakeup.set()
+
+    async def dispatch_batch(self) -> int:
+        """Send one batch of due events; return how many were claimed."""
+        async with SessionLocal() as db:
+            events = await claim_events(db, self.batch_size, settings.outbox_max_attempts)
+            if not events:
+                await db.rollback()
+                return 0
+            ids = [event.id for event in events]
+            # The rows stay locked while the batch is sent, so no other
+            # worker sends it at the same time.
+            try:
+                await self.sink.send(events)
+            except Exception as e:
+                logger.warning("Outbox batch of %d events failed: %s", len(events), e)
+                OUTBOX_EVENTS.labels('failed').inc(len(events))
+                await mark_failed(db, ids, f"{type(e).__name__}: {e}",
+                                  settings.outbox_backoff_base, settings.outbox_backoff_max)
+            else:
+                OUTBOX_EVENTS.labels('dispatched').inc(len(events))
+                await mark_dispatched(db, ids)
+            await db.commit()
+            return len(events)
+
+    async def purge(self):
+        if time.monotonic() - self._purged_at < settings.outbox_purge_interval:
+            return
+        self._purged_at = time.monotonic()
+        async with SessionLocal() as db:
+            removed = await purge_dispatched(db, timedelta(hours=settings.outbox_retention_hours))
+            await db.commit()
+        if removed:
+            logger.info("Outbox purge removed %d dispatched events", removed)
+
+    async def run(self, poll_interval: float):
+        while True:
+            try:
+                # A full batch means more are probably due: keep going without waiting.
+                if await self.dispatch_batch() == self.batch_size:
+                    continue
+                await self.purge()
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+            try:
+                async with asyncio.timeout(poll_interval):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+dispatcher: OutboxDispatcher | None = None
+
+
+def wake_dispatcher():
+    if dispatcher is not None:
+        dispatcher.wake()
+
+
+async def outbox_loop(sink):
+    """Dispatch until cancelled; ``sink`` comes from ``make_sink`` at startup, so bad settings fail there."""
+    global dispatcher
+    dispatcher = OutboxDispatcher(sink, settings.outbox_batch_size)
+    try:
+        await dispatcher.run(settings.outbox_poll_interval)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Outbox dispatcher stopped; order events are no longer sent")
+        raise
+    finally:
+        await dispatcher.sink.close()
+        dispatcher = None
@@ -0,0 +1,85 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Sequence
+from uuid import UUID
+
+from fastapi import HTTPException, Query, status
+
+from src.config.config import settings
+from src.config.messages import INVALID_CURSOR
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+@dataclass
+class Page:
+    items: list
+    next_cursor: str | None = None
+
+
+@dataclass
+class PageParams:
+    limit: int
+    cursor: str | None
+
+
+def page_params(limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+                cursor: str | None = Query(None)) -> PageParams:
+    return PageParams(limit=limit, cursor=cursor)
+
+
+def _cursor_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (int, float)):
+        return value
+    return str(value)
+
+
+def encode_cursor(*values) -> str:
+    """Opaque cursor holding the sort key of the last row of a page."""
+    raw = json.dumps([_cursor_value(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> list:
+    """Sort key values of ``cursor`` converted with ``types``; any malformed or tampered cursor is a 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        # encode_cursor writes strings and numbers only; e.g. UUID(5) would raise AttributeError.
+        if not all(isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in values):
+            raise TypeError(cursor)
+        return [convert(value) for convert, value in zip(types, values)]
+    except (ValueError, TypeError, AttributeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_CURSOR)
+
+
+CREATED_AT_ID = (datetime.fromisoformat, UUID)
+
+
+def make_page(rows: Sequence, limit: int, sort_key: Callable[[Any], tuple]) -> Page:
+    """Build a page from ``limit + 1`` fetched rows; the extra row only signals that more exist."""
+    items = list(rows[:limit])
+    if len(rows) <= limit:
+        return Page(items=items)
+    return Page(items=items, next_cursor=encode_cursor(*sort_key(items[-1])))
+
+
+def next_cursor_headers(page: Page) -> dict:
+    return {NEXT_CURSOR_HEADER: page.next_cursor} if page.next_cursor else {}
+
+
+def pack_page(body: bytes, next_cursor: str | None) -> bytes:
+    """Store a serialized page as one cache value: the next cursor, a newline, then the body."""
+    return (next_cursor or '').encode() + b'\n' + body
+
+
+def unpack_page(value: bytes) -> tuple[bytes, str | None]:
+    next_cursor, _, body = value.partition(b'\n')
+    return body, next_cursor.decode() or None
@@ -0,0 +1,177 @@
+"""Per-request SQL audit for development and canary instances.
+
+``QueryAuditMiddleware`` records every statement a request executes and flags
+the request when it runs more than ``query_audit_max_statements`` statements,
+repeats one statement ``query_audit_repeat_threshold`` times (the usual shape
+of an N+1 query) or has a statement slower than ``query_audit_slow_ms``. Each
+flagged request gets a JSON report in ``query_audit_report_dir`` with the
+repeated statements and the ``EXPLAIN`` plans of the slowest ones. Parameter
+values are never written to reports.
+
+``assert_max_queries`` gives tests the same count without the middleware.
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import AsyncExitStack, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.config.config import settings
+from src.database.db import engine
+from src.database.instrumentation import QueryLog, QueryRecord, current_log, global_logs
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = re.compile(r'\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+
+_report_tasks: set[asyncio.Task] = set()
+
+
+class TooManyQueries(AssertionError):
+    pass
+
+
+@contextmanager
+def capture_queries():
+    """Collect every statement the process executes while the block runs.
+
+    Not scoped to a request, so it is only meant for tests, where nothing else
+    runs concurrently (``TestClient`` serves requests from another thread).
+    """
+    log = QueryLog()
+    global_logs.append(log)
+    try:
+        yield log
+    finally:
+        global_logs.remove(log)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """Fail with ``TooManyQueries`` when the block executes more than ``limit`` statements."""
+    with capture_queries() as log:
+        yield log
+    if len(log.records) > limit:
+        statements = "\n".join(f"  {record.function}: {record.statement}" for record in log.records)
+        raise TooManyQueries(f"{len(log.records)} statements executed, expected at most {limit}:\n{statements}")
+
+
+def _repeated(records: list[QueryRecord]) -> list[dict]:
+    counts = Counter(record.statement for record in records)
+    return [
+        {"statement": statement, "count": count}
+        for statement, count in counts.most_common()
+        if count >= settings.query_audit_repeat_threshold
+    ]
+
+
+async def explain_statement(record: QueryRecord, conn: AsyncConnection | None = None):
+    """``EXPLAIN (FORMAT JSON)`` plan of a captured statement, run on ``conn`` or a new connection.
+
+    None for statements that cannot be planned, ``{"error": ...}`` when planning fails.
+    """
+    if record.executemany or not EXPLAINABLE.match(record.statement):
+        return None
+    try:
+        # Plain EXPLAIN only plans the statement, so writes are not executed again.
+        async with AsyncExitStack() as stack:
+            if conn is None:
+                conn = await stack.enter_async_context(engine.connect())
+            plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {record.statement}",
+                                               record.parameters)).scalar()
+        return json.loads(plan) if isinstance(plan, str) else plan
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _write_report(report: dict) -> Path:
+    directory = Path(settings.query_audit_report_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    route = re.sub(r'[^A-Za-z0-9]+', '_', report["route"]).strip('_') or 'root'
+    file_path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{report['method']}-{route}-{uuid4().hex[:8]}.json"
+    file_path.write_text(json.dumps(report, indent=2, default=str))
+    return file_path
+
+
+async def report_request(method: str, route: str, path: str, status_code: int, log: QueryLog):
+    records = log.records
+    repeated = _repeated(records)
+    slowest = sorted(records, key=lambda record: record.duration, reverse=True)
+    slow = slowest and slowest[0].duration * 1000 >= settings.query_audit_slow_ms
+    if len(records) <= settings.query_audit_max_statements and not repeated and not slow:
+        return
+
+    report = {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "method": method,
+        "route": route,
+        "path": path,
+        "status": status_code,
+        "statements": len(records),
+        "total_ms": round(sum(record.duration for record in records) * 1000, 3),
+        "repeated": repeated,
+        "slowest": [
+            {
+                "statement": record.statement,
+                "function": record.function,
+                "duration_ms": round(record.duration * 1000, 3),
+                "plan": await explain_statement(record),
+            }
+            for record in slowest[:settings.query_audit_explain_top]
+        ],
+    }
+    file_path = await asyncio.to_thread(_write_report, report)
+    logger.warning("Query audit: %s %s ran %d statements (%d repeated) in %.1f ms, report %s",
+                   method, route, len(records), len(repeated), report["total_ms"], file_path)
+
+
+class QueryAuditMiddleware:
+    """Flags requests with too many, repeated or slow SQL statements; see the module docstring.
+
+    Reports, including the ``EXPLAIN`` round trips, are produced in a background
+    task after the response is sent. ``query_audit_sample_rate`` limits the
+    share of audited requests on canaries.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    async def _report(*args):
+        try:
+            await report_request(*args)
+        except Exception as e:
+            logger.warning("Query audit report failed: %s", e)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or random.random() >= settings.query_audit_sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        log = QueryLog()
+        token = current_log.set(log)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_log.reset(token)
+            if log.records:
+                route = getattr(scope.get('route'), 'path', '<other>')
+                task = asyncio.create_task(self._report(scope['method'], route, scope['path'], status_code, log))
+                _report_tasks.add(task)
+                task.add_done_callback(_report_tasks.discard)
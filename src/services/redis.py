@@ -0,0 +1,22 @@
+from redis.asyncio import Redis
+
+from src.config.config import settings
+
+_client: Redis | None = None
+
+
+def get_redis() -> Redis:
+    global _client
+    if _client is None:
+        _client = Redis(host=settings.redis_host,
+                        port=settings.redis_port,
+                        socket_timeout=settings.redis_timeout,
+                        socket_connect_timeout=settings.redis_timeout)
+    return _client
+
+
+async def close_redis():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,23 @@
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.config.config import settings
+
+
+def json_response(adapter: TypeAdapter, data, status_code: int = 200, headers: dict | None = None) -> Response:
+    """Build the JSON response of a route that returns schema objects.
+
+    By default the data takes the ``response_model`` path: dumped, validated against the
+    schema again and encoded by ``JSONResponse``, as FastAPI does for a returned object.
+    With the opt-in ``fast_json`` the already-validated objects are serialized once, in
+    pydantic-core, skipping that validation and the ``jsonable_encoder`` pass. The route
+    keeps its ``response_model`` for the OpenAPI schema; returning a ``Response`` makes
+    FastAPI send the bytes as they are.
+    """
+    if not settings.fast_json:
+        validated = adapter.validate_python(adapter.dump_python(data, by_alias=True), from_attributes=True)
+        return JSONResponse(content=adapter.dump_python(validated, mode='json', by_alias=True),
+                            status_code=status_code, headers=headers)
+    return Response(content=adapter.dump_json(data, by_alias=True), status_code=status_code,
+                    media_type="application/json", headers=headers)
@@ -0,0 +1,129 @@
+"""Static files, with precompressed variants.
+
+    python -m src.services.static ./static/
+
+writes a ``.gz`` sibling, and a ``.br`` one when the ``brotli`` package is
+installed, next to every text asset (CSS, JS, SVG, JSON, ...) under the
+directory. The Docker image runs it at build time. Images are left alone:
+JPEG, WebP and AVIF are compressed already.
+"""
+import argparse
+import gzip
+import os
+from mimetypes import guess_type
+from pathlib import Path
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+from src.config.config import settings
+from src.config.constants import STATIC_DIR
+from src.services.images import HASHED_IMAGE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml')
+
+
+def accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    """Encoding -> quality of an ``Accept-Encoding`` header; ``br;q=0`` refuses brotli."""
+    encodings = {}
+    for item in accept_encoding.split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[name.lower()] = quality
+    return encodings
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """``StaticFiles`` tuned for content-addressed assets.
+
+    Hashed images never change, so they are sent with a long-lived immutable
+    ``Cache-Control``. When a ``.br`` or ``.gz`` sibling of a file exists and the
+    client accepts that encoding with a non-zero quality, the precompressed file
+    is sent instead; the client's preferred one wins, brotli on a tie.
+    ``FileResponse`` also supports the ASGI ``pathsend`` extension, so servers that
+    implement it send files without copying them through Python.
+    """
+
+    PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        path = os.fspath(full_path)
+        accepted = accepted_encodings(Headers(scope=scope).get('accept-encoding', ''))
+        encoding = None
+        best_quality = 0.0
+        has_precompressed = False
+        for name, suffix in self.PRECOMPRESSED:
+            if not os.path.isfile(path + suffix):
+                continue
+            has_precompressed = True
+            quality = accepted.get(name, accepted.get('*', 0.0))
+            if quality > best_quality:
+                encoding, best_quality = name, quality
+                full_path, stat_result = path + suffix, os.stat(path + suffix)
+
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if encoding is not None:
+            response.headers['content-encoding'] = encoding
+            response.headers['content-type'] = guess_type(path)[0] or 'application/octet-stream'
+        if has_precompressed:
+            response.headers['vary'] = 'Accept-Encoding'
+        if HASHED_IMAGE.search(Path(path).as_posix()):
+            response.headers['cache-control'] = settings.static_immutable_cache_control
+        return response
+
+
+def _write_compressed(target: Path, data: bytes):
+    temp_path = target.with_name(f".{target.name}.tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, target)
+
+
+def precompress(directory: str = STATIC_DIR) -> int:
+    """Write the ``.gz`` and ``.br`` siblings of the text assets under ``directory``; returns how many.
+
+    A sibling is only kept when it is smaller than the file and rewritten when the file is newer.
+    """
+    compressors = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    written = 0
+    for file_path in sorted(Path(directory).rglob('*')):
+        content_type, file_encoding = guess_type(file_path.name)
+        # file_encoding is set for the .gz and .br files themselves.
+        if (not file_path.is_file() or file_path.name.startswith('.') or file_encoding is not None
+                or not (content_type or '').startswith(COMPRESSIBLE_TYPES)):
+            continue
+        data = None
+        for suffix, compress in compressors:
+            target = file_path.with_name(file_path.name + suffix)
+            if target.exists() and target.stat().st_mtime >= file_path.stat().st_mtime:
+                continue
+            data = file_path.read_bytes() if data is None else data
+            compressed = compress(data)
+            if len(compressed) < len(data):
+                _write_compressed(target, compressed)
+                written += 1
+            else:
+                target.unlink(missing_ok=True)
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs='?', default=STATIC_DIR)
+    args = parser.parse_args()
+    print(f"precompressed {precompress(args.directory)} files in {args.directory}")
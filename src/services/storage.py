@@ -0,0 +1,253 @@
+import asyncio
+import os
+import shutil
+from abc import ABC, abstractmethod
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import AsyncIterator, NamedTuple
+from uuid import uuid4
+
+from aiobotocore.session import get_session
+from botocore.exceptions import ClientError
+
+from src.config.config import settings
+from src.config.constants import STATIC_DIR
+
+
+class StoredObject(NamedTuple):
+    path: str
+    size: int
+    modified: float
+
+
+class DirectUploadUnsupported(Exception):
+    """The storage backend cannot give browsers a presigned upload form."""
+
+
+class Storage(ABC):
+    """Where meal images live, addressed by relative paths such as ``images/ab/<key>-thumb.jpg``.
+
+    All methods are async. Backends must make ``save_file`` atomic: readers see
+    either no object or the complete one. Backends that set ``supports_direct_upload``
+    implement ``presigned_upload``.
+    """
+
+    supports_direct_upload: bool = False
+
+    @abstractmethod
+    async def save_file(self, path: str, local_path: str, content_type: str | None = None,
+                        cache_control: str | None = None) -> None:
+        ...
+
+    @abstractmethod
+    async def download(self, path: str, local_path: str) -> None:
+        ...
+
+    @abstractmethod
+    async def stat(self, path: str) -> StoredObject | None:
+        ...
+
+    @abstractmethod
+    async def touch(self, path: str) -> None:
+        """Refresh the modification time so the image GC treats the object as new."""
+
+    @abstractmethod
+    async def delete(self, path: str) -> None:
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str) -> AsyncIterator[StoredObject]:
+        ...
+
+    async def presigned_upload(self, path: str, content_type: str, max_size: int, expires_in: int) -> dict:
+        """URL and form fields for a browser to POST a file straight to the backend."""
+        raise DirectUploadUnsupported(type(self).__name__)
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalStorage(Storage):
+    """Files under ``STATIC_DIR``, served by the ``/static`` mount. Only works with one app host."""
+
+    def __init__(self, root: str = STATIC_DIR):
+        self.root = Path(root)
+
+    def _path(self, path: str) -> Path:
+        return self.root / path
+
+    @staticmethod
+    def _copy(source: str, target: Path):
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = target.with_name(f".{target.name}.{uuid4().hex}.tmp")
+        try:
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, target)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+    async def save_file(self, path, local_path, content_type=None, cache_control=None):
+        await asyncio.to_thread(self._copy, local_path, self._path(path))
+
+    async def download(self, path, local_path):
+        await asyncio.to_thread(shutil.copyfile, self._path(path), local_path)
+
+    async def stat(self, path):
+        try:
+            stat_result = await asyncio.to_thread(os.stat, self._path(path))
+        except FileNotFoundError:
+            return None
+        return StoredObject(path, stat_result.st_size, stat_result.st_mtime)
+
+    async def touch(self, path):
+        await asyncio.to_thread(os.utime, self._path(path))
+
+    async def delete(self, path):
+        await asyncio.to_thread(self._path(path).unlink, missing_ok=True)
+
+    def _scan(self, prefix: str) -> list[StoredObject]:
+        objects = []
+        for file_path in self._path(prefix).rglob('*'):
+            if file_path.is_file():
+                stat_result = file_path.stat()
+                objects.append(StoredObject(file_path.relative_to(self.root).as_posix(),
+                                            stat_result.st_size, stat_result.st_mtime))
+        return objects
+
+    async def list(self, prefix):
+        for stored in await asyncio.to_thread(self._scan, prefix):
+            yield stored
+
+
+class S3Storage(Storage):
+    """An S3-compatible bucket (AWS S3, MinIO, ...) accessed through aiobotocore.
+
+    One client is created on first use and reused, so requests share its
+    connection pool. Files larger than ``s3_part_size`` are sent as a multipart
+    upload, one part in memory at a time.
+    """
+
+    supports_direct_upload = True
+
+    def __init__(self):
+        self.bucket = settings.s3_bucket
+        self._client = None
+        self._exit_stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
+
+    async def client(self):
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    self._client = await self._exit_stack.enter_async_context(get_session().create_client(
+                        's3',
+                        endpoint_url=settings.s3_endpoint_url,
+                        region_name=settings.s3_region,
+                        aws_access_key_id=settings.s3_access_key,
+                        aws_secret_access_key=settings.s3_secret_key,
+                    ))
+        return self._client
+
+    async def save_file(self, path, local_path, content_type=None, cache_control=None):
+        client = await self.client()
+        headers = {}
+        if content_type:
+            headers['ContentType'] = content_type
+        if cache_control:
+            headers['CacheControl'] = cache_control
+
+        part_size = settings.s3_part_size
+        with open(local_path, 'rb') as source:
+            if os.fstat(source.fileno()).st_size <= part_size:
+                body = await asyncio.to_thread(source.read)
+                await client.put_object(Bucket=self.bucket, Key=path, Body=body, **headers)
+                return
+
+            upload = await client.create_multipart_upload(Bucket=self.bucket, Key=path, **headers)
+            upload_id = upload['UploadId']
+            try:
+                parts = []
+                while part := await asyncio.to_thread(source.read, part_size):
+                    number = len(parts) + 1
+                    response = await client.upload_part(Bucket=self.bucket, Key=path, UploadId=upload_id,
+                                                        PartNumber=number, Body=part)
+                    parts.append({'ETag': response['ETag'], 'PartNumber': number})
+                await client.complete_multipart_upload(Bucket=self.bucket, Key=path, UploadId=upload_id,
+                                                       MultipartUpload={'Parts': parts})
+            except BaseException:
+                await client.abort_multipart_upload(Bucket=self.bucket, Key=path, UploadId=upload_id)
+                raise
+
+    async def download(self, path, local_path):
+        client = await self.client()
+        response = await client.get_object(Bucket=self.bucket, Key=path)
+        body = response['Body']
+        async with body:
+            with open(local_path, 'wb') as target:
+                while chunk := await body.read(settings.upload_chunk_size):
+                    await asyncio.to_thread(target.write, chunk)
+
+    async def stat(self, path):
+        client = await self.client()
+        try:
+            response = await client.head_object(Bucket=self.bucket, Key=path)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return StoredObject(path, response['ContentLength'], response['LastModified'].timestamp())
+
+    async def touch(self, path):
+        # S3 has no utime; copying an object onto itself resets LastModified.
+        client = await self.client()
+        head = await client.head_object(Bucket=self.bucket, Key=path)
+        headers = {'ContentType': head.get('ContentType', 'binary/octet-stream')}
+        if head.get('CacheControl'):
+            headers['CacheControl'] = head['CacheControl']
+        await client.copy_object(Bucket=self.bucket, Key=path, CopySource={'Bucket': self.bucket, 'Key': path},
+                                 MetadataDirective='REPLACE', **headers)
+
+    async def delete(self, path):
+        client = await self.client()
+        await client.delete_object(Bucket=self.bucket, Key=path)
+
+    async def list(self, prefix):
+        client = await self.client()
+        paginator = client.get_paginator('list_objects_v2')
+        async for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get('Contents', []):
+                yield StoredObject(item['Key'], item['Size'], item['LastModified'].timestamp())
+
+    async def presigned_upload(self, path, content_type, max_size, expires_in):
+        # A presigned POST rather than PUT: the policy makes the bucket itself
+        # reject bodies over the size limit or of another content type.
+        client = await self.client()
+        return await client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=path,
+            Fields={'Content-Type': content_type},
+            Conditions=[{'Content-Type': content_type}, ['content-length-range', 1, max_size]],
+            ExpiresIn=expires_in,
+        )
+
+    async def close(self):
+        await self._exit_stack.aclose()
+        self._client = None
+
+
+_storage: Storage | None = None
+
+
+def get_storage() -> Storage:
+    global _storage
+    if _storage is None:
+        _storage = S3Storage() if settings.storage_backend == 's3' else LocalStorage()
+    return _storage
+
+
+async def close_storage():
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Tests using the ``db`` fixture migrate and empty the database at
+# TEST_DATABASE_URL. Settings are read at import time, so it replaces
+# DATABASE_URL before anything from ``src`` is imported.
+if os.environ.get('TEST_DATABASE_URL'):
+    os.environ['DATABASE_URL'] = os.environ['TEST_DATABASE_URL']
+
+import fakeredis
+import pytest
+from sqlalchemy import text
+
+from src.database.db import SessionLocal, engine
+from src.database.models import Base
+from src.services.cache import MenuCache
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def make_redis(redis_server):
+    """Clients of one in-memory Redis server, like the connections of separate workers."""
+    return lambda: fakeredis.FakeAsyncRedis(server=redis_server)
+
+
+@pytest.fixture
+def make_menu_cache(make_redis):
+    def make(**options):
+        client = make_redis()
+        options = {"enabled": True, "ttl": 600, "local_ttl": 60, "max_items": 100, **options}
+        return MenuCache(redis_factory=lambda: client, **options)
+    return make
+
+
+@pytest.fixture(scope='session')
+def migrated_database():
+    if not os.environ.get('TEST_DATABASE_URL'):
+        pytest.skip("TEST_DATABASE_URL is not set")
+    subprocess.run([sys.executable, '-m', 'alembic', 'upgrade', 'head'], cwd=ROOT, check=True)
+
+
+@pytest.fixture
+async def db(migrated_database):
+    """A session on the emptied test database; the app's own sessions see the same data."""
+    tables = ', '.join(table.name for table in Base.metadata.sorted_tables)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    async with SessionLocal() as session:
+        yield session
+    # Pooled connections belong to this test's event loop.
+    await engine.dispose()
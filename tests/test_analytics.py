@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import insert, select
+
+from src.database.models import Meal, MealDailyStats
+from src.repository import analytics
+
+pytestmark = pytest.mark.anyio
+
+DAY = date(2024, 3, 1)
+
+
+@pytest.fixture
+async def meal_id(db):
+    result = await db.execute(insert(Meal).returning(Meal.id), [{"name": "Borscht", "price": 12}])
+    meal_id = result.scalar_one()
+    await db.commit()
+    return meal_id
+
+
+async def test_orders_of_one_meal_spread_over_shards(db, meal_id, monkeypatch):
+    shards = iter([0, 1, 1])
+    monkeypatch.setattr(analytics.random, 'randrange', lambda stop: next(shards))
+    for quantity in (1, 2, 3):
+        await analytics.record_order_stats(db, [(uuid4(), DAY, meal_id, quantity, Decimal('12.00'))])
+        await db.commit()
+
+    rows = (await db.execute(
+        select(MealDailyStats.shard, MealDailyStats.order_count, MealDailyStats.quantity)
+        .order_by(MealDailyStats.shard)
+    )).all()
+    assert [tuple(row) for row in rows] == [(0, 1, 1), (1, 2, 5)]
+
+    [sales] = await analytics.get_daily_sales(db, DAY, DAY, meal_id)
+    assert (sales["order_count"], sales["quantity"], sales["revenue"]) == (3, 6, Decimal('72.00'))
+    [top] = await analytics.get_top_meals(db, DAY - timedelta(days=1), DAY, 'quantity', 10)
+    assert (top.meal_id, top.order_count, top.quantity, top.revenue) == (meal_id, 3, 6, Decimal('72.00'))
+    [total] = await analytics.get_daily_sales(db, DAY, DAY)
+    assert (total["order_count"], total["quantity"]) == (3, 6)
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+from uuid import uuid4
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.repository import meals as repository_meals
+from src.schemas.meals import CreateMealModel, UpdateMealModel
+from src.services import cache as cache_module
+from src.services.cache import MEAL, MEALS, LocalCache
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    return clock
+
+
+class FakeResult:
+    def __init__(self, meal=None, rowcount=0):
+        self.meal = meal
+        self.rowcount = rowcount
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self.meal
+
+
+class FakeSession:
+    """Just enough of ``AsyncSession`` for the meal write functions."""
+
+    def __init__(self, meal=None):
+        self.meal = meal
+
+    async def execute(self, statement):
+        return FakeResult(self.meal, rowcount=1 if self.meal else 0)
+
+    def add(self, meal):
+        pass
+
+    async def merge(self, meal):
+        return meal
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, meal):
+        if meal.id is None:
+            meal.id = uuid4()
+
+
+def test_local_cache_expires_entries(clock):
+    local = LocalCache(max_items=10, ttl=60)
+    local.set(MEAL, 'a', b'1')
+    clock.now += 59
+    assert local.get(MEAL, 'a') == b'1'
+    clock.now += 2
+    assert local.get(MEAL, 'a') is None
+
+
+def test_local_cache_evicts_least_recently_used():
+    local = LocalCache(max_items=2, ttl=60)
+    local.set(MEAL, 'a', b'1')
+    local.set(MEAL, 'b', b'2')
+    local.get(MEAL, 'a')
+    local.set(MEAL, 'c', b'3')
+    assert local.get(MEAL, 'b') is None
+    assert local.get(MEAL, 'a') == b'1'
+    assert local.get(MEAL, 'c') == b'3'
+
+
+async def test_redis_tier_is_a_hash_per_namespace(make_menu_cache, make_redis):
+    writer, reader = make_menu_cache(), make_menu_cache()
+    await writer.set(MEALS, '50:', b'menu', await writer.generation(MEALS))
+
+    redis = make_redis()
+    assert await redis.hget('menu:meals', '50:') == b'menu'
+    assert 0 < await redis.ttl('menu:meals') <= 600
+    assert await reader.get(MEALS, '50:') == b'menu'
+    assert reader.local.get(MEALS, '50:') == b'menu'
+
+
+async def test_set_is_skipped_after_invalidation_in_another_worker(make_menu_cache, make_redis):
+    reader, writer = make_menu_cache(), make_menu_cache()
+    generation = await reader.generation(MEALS)
+    await writer.invalidate((MEALS, None))
+    await reader.set(MEALS, '50:', b'stale', generation)
+
+    assert reader.local.get(MEALS, '50:') is None
+    assert await make_redis().hget('menu:meals', '50:') is None
+    await reader.set(MEALS, '50:', b'fresh', await reader.generation(MEALS))
+    assert await reader.get(MEALS, '50:') == b'fresh'
+
+
+async def test_set_is_skipped_after_local_invalidation(make_menu_cache):
+    cache = make_menu_cache()
+    generation = await cache.generation(MEAL)
+    await cache.invalidate((MEAL, 'a'))
+    await cache.set(MEAL, 'a', b'stale', generation)
+    assert await cache.get(MEAL, 'a') is None
+
+
+async def test_invalidation_reaches_other_workers(make_menu_cache):
+    writer, other = make_menu_cache(), make_menu_cache()
+    listener = asyncio.create_task(other.listen())
+    try:
+        await asyncio.sleep(0.1)
+        other.local.set(MEALS, '50:', b'menu')
+        other.local.set(MEAL, 'a', b'meal')
+        other.local.set(MEAL, 'b', b'other meal')
+        generation = await other.generation(MEAL)
+
+        await writer.invalidate((MEALS, None), (MEAL, 'a'))
+        for _ in range(50):
+            if other.local.get(MEAL, 'a') is None:
+                break
+            await asyncio.sleep(0.05)
+
+        assert other.local.get(MEALS, '50:') is None
+        assert other.local.get(MEAL, 'a') is None
+        assert other.local.get(MEAL, 'b') == b'other meal'
+        await other.set(MEAL, 'a', b'stale', generation)
+        assert other.local.get(MEAL, 'a') is None
+    finally:
+        listener.cancel()
+
+
+class UnreachableRedis:
+    def pubsub(self, **kwargs):
+        raise RedisConnectionError("Connection refused")
+
+
+async def test_listener_outage_clears_and_warns_once(make_menu_cache, make_redis, monkeypatch, caplog):
+    redis, unreachable = make_redis(), UnreachableRedis()
+    reachable = False
+    cache = make_menu_cache()
+    cache.redis_factory = lambda: redis if reachable else unreachable
+    monkeypatch.setattr(cache, 'RETRY_AFTER', 0.01)
+    cache.local.set(MEAL, 'a', b'before the outage')
+
+    with caplog.at_level(logging.INFO, logger=cache_module.__name__):
+        listener = asyncio.create_task(cache.listen())
+        try:
+            await asyncio.sleep(0.02)
+            assert cache.local.get(MEAL, 'a') is None
+            cache.local.set(MEAL, 'a', b'during the outage')
+            await asyncio.sleep(0.1)
+            assert cache.local.get(MEAL, 'a') == b'during the outage'
+
+            reachable = True
+            for _ in range(50):
+                if cache.local.get(MEAL, 'a') is None:
+                    break
+                await asyncio.sleep(0.01)
+            assert cache.local.get(MEAL, 'a') is None
+        finally:
+            listener.cancel()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert [message for message in messages if 'disconnected' in message] == [
+        "Menu cache listener disconnected: Connection refused; retrying every 0.01 s"]
+    assert "Menu cache listener reconnected" in messages
+
+
+@pytest.fixture
+def cached_menu(make_menu_cache, monkeypatch):
+    cache = make_menu_cache()
+    monkeypatch.setattr(repository_meals, 'menu_cache', cache)
+    return cache
+
+
+async def fill(cache, meal_id):
+    await cache.set(MEALS, '50:', b'menu', await cache.generation(MEALS))
+    await cache.set(MEAL, str(meal_id), b'meal', await cache.generation(MEAL))
+
+
+async def assert_invalidated(cache, meal_id):
+    assert await cache.get(MEALS, '50:') is None
+    assert await cache.get(MEAL, str(meal_id)) is None
+
+
+async def test_add_meal_invalidates(cached_menu):
+    await fill(cached_menu, uuid4())
+    await repository_meals.add_meal(CreateMealModel(name='Borscht', price=9.5, description='Soup'), FakeSession())
+    assert await cached_menu.get(MEALS, '50:') is None
+
+
+async def test_update_meal_invalidates(cached_menu):
+    meal_id = uuid4()
+    await fill(cached_menu, meal_id)
+    body = UpdateMealModel(id=meal_id, name='Borscht', price=10, description='Soup')
+    await repository_meals.update_meal(body, FakeSession())
+    await assert_invalidated(cached_menu, meal_id)
+
+
+async def test_delete_meal_invalidates(cached_menu):
+    meal_id = uuid4()
+    await fill(cached_menu, meal_id)
+    await repository_meals.delete_meal(meal_id, FakeSession())
+    await assert_invalidated(cached_menu, meal_id)
+
+
+async def test_set_file_name_invalidates(cached_menu):
+    meal_id = uuid4()
+    meal = repository_meals.Meal(id=meal_id, name='Borscht', price=9.5)
+    await fill(cached_menu, meal_id)
+    await repository_meals.set_file_name(meal_id, 'images/a.webp', FakeSession(meal), {'webp': {}})
+    await assert_invalidated(cached_menu, meal_id)
@@ -0,0 +1,113 @@
+import base64
+import io
+import json
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from main import app
+from src.config.messages import (DIRECT_UPLOAD_UNAVAILABLE, IMAGE_TOO_LARGE, INVALID_CURSOR, MEAL_NOT_FOUND,
+                                 NOT_AN_IMAGE)
+from src.database.db import get_db
+from src.services import storage
+from src.services.cache import menu_cache
+from src.services.images import MAX_IMAGE_PIXELS, shutdown_image_workers
+
+
+class EmptySession:
+    async def execute(self, statement):
+        return self
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return None
+
+
+class MealSession(EmptySession):
+    def __init__(self, meal):
+        self.meal = meal
+
+    def first(self):
+        return self.meal
+
+
+@pytest.fixture
+def client():
+    async def empty_db():
+        yield EmptySession()
+
+    app.dependency_overrides[get_db] = empty_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def meal_client(monkeypatch, tmp_path):
+    """Client whose database has one meal, with images in a temporary local storage."""
+    meal = SimpleNamespace(id=uuid4())
+
+    async def meal_db():
+        yield MealSession(meal)
+
+    monkeypatch.setattr(storage, '_storage', storage.LocalStorage(str(tmp_path)))
+    app.dependency_overrides[get_db] = meal_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    shutdown_image_workers()
+
+
+def test_delete_missing_meal_is_404(client):
+    meal_id = uuid4()
+    response = client.delete(f"/api/meals/{meal_id}")
+    assert response.status_code == 404
+    assert response.json()["detail"] == MEAL_NOT_FOUND.format(meal_id=meal_id)
+
+
+def test_upload_to_missing_meal_is_404(client):
+    meal_id = uuid4()
+    response = client.post(f"/api/meals/upload/{meal_id}", files={"file": ("a.png", b"png", "image/png")})
+    assert response.status_code == 404
+    assert response.json()["detail"] == MEAL_NOT_FOUND.format(meal_id=meal_id)
+
+
+def test_tampered_cursor_is_400(client, monkeypatch):
+    monkeypatch.setattr(menu_cache, 'enabled', False)
+    cursor = base64.urlsafe_b64encode(json.dumps(["2024-01-01T00:00:00", 5]).encode()).decode()
+
+    response = client.get("/api/meals/", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == INVALID_CURSOR
+
+
+def test_presign_without_direct_upload_support_is_501(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, '_storage', storage.LocalStorage(str(tmp_path)))
+
+    response = client.post(f"/api/meals/upload/{uuid4()}/presign", params={"content_type": "image/png"})
+
+    assert response.status_code == 501
+    assert response.json()["detail"] == DIRECT_UPLOAD_UNAVAILABLE
+
+
+def test_upload_of_non_image_bytes_is_415(meal_client):
+    response = meal_client.post(f"/api/meals/upload/{uuid4()}",
+                                files={"file": ("menu.png", b"%PDF-1.7 not an image", "image/png")})
+
+    assert response.status_code == 415
+    assert response.json()["detail"] == NOT_AN_IMAGE
+
+
+def test_upload_of_oversized_image_is_413(meal_client):
+    # 8000 x 8000 pixels of one-bit black: a few kilobytes of PNG, above MAX_IMAGE_PIXELS.
+    png = io.BytesIO()
+    Image.new('1', (8000, 8000)).save(png, format='PNG')
+
+    response = meal_client.post(f"/api/meals/upload/{uuid4()}", files={"file": ("big.png", png.getvalue(), "image/png")})
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == IMAGE_TOO_LARGE.format(limit=MAX_IMAGE_PIXELS)
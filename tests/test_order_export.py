@@ -0,0 +1,58 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from sqlalchemy import insert
+
+from main import app
+from src.database.models import Meal
+from src.services.export import naive_utc
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client(db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        yield client
+
+
+@pytest.fixture
+async def order_id(db, client):
+    meal_id = (await db.execute(insert(Meal).values(name="Borscht", price=12).returning(Meal.id))).scalar_one()
+    await db.commit()
+    response = await client.post('/api/orders/', json={
+        "customer": {"name": "Alice Smith", "email": "alice@example.com", "street": "1 Main Street",
+                     "city": "Kyiv", "postal-code": "01001"},
+        "items": [{"id": str(meal_id), "quantity": 1}],
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_naive_utc():
+    assert naive_utc(None) is None
+    assert naive_utc(datetime(2024, 1, 1, 12)) == datetime(2024, 1, 1, 12)
+    assert naive_utc(datetime(2024, 1, 1, 12, tzinfo=timezone(timedelta(hours=2)))) == datetime(2024, 1, 1, 10)
+
+
+@pytest.mark.parametrize('format', ['ndjson', 'csv'])
+async def test_export_accepts_timezone_aware_bounds(client, order_id, format):
+    start = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat().replace('+00:00', 'Z')
+    end = (datetime.now(timezone(timedelta(hours=3))) + timedelta(hours=1)).isoformat()
+
+    response = await client.get('/api/orders/export', params={"format": format, "start": start, "end": end})
+
+    assert response.status_code == 200
+    assert order_id in response.text
+
+
+async def test_export_bounds_are_compared_in_utc(client, order_id):
+    # One minute ago in UTC+14 is a wall-clock time 14 hours ahead of the stored UTC timestamps.
+    start = (datetime.now(timezone(timedelta(hours=14))) - timedelta(minutes=1)).isoformat()
+
+    response = await client.get('/api/orders/export', params={"start": start})
+
+    assert response.status_code == 200
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [order_id]
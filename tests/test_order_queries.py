@@ -0,0 +1,132 @@
+"""Statement budgets of the order endpoints.
+
+Each budget is the number of statements the endpoint runs, however many orders
+or items it handles: a new statement per order or item fails the test.
+"""
+from uuid import uuid4
+
+import httpx
+import pytest
+from sqlalchemy import insert
+
+from main import app
+from src.database.models import Meal
+from src.services.query_audit import assert_max_queries
+
+pytestmark = pytest.mark.anyio
+
+# order version, order with its items
+GET_ORDER_QUERIES = 2
+# page of orders with their items
+LIST_ORDERS_QUERIES = 1
+# meals, order, items, daily stats, sales totals, outbox event
+CREATE_ORDER_QUERIES = 6
+# meals, orders, daily stats, sales totals, outbox events; items go in by COPY
+BULK_ORDERS_QUERIES = 5
+
+
+@pytest.fixture
+async def client(db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        yield client
+
+
+@pytest.fixture
+async def meal_ids(db):
+    result = await db.execute(insert(Meal).returning(Meal.id), [
+        {"name": f"Meal {number}", "price": 10 + number, "description": f"Meal number {number}"}
+        for number in range(5)
+    ])
+    ids = list(result.scalars().all())
+    await db.commit()
+    return ids
+
+
+def order_body(meal_ids, name: str = 'Alice Smith') -> dict:
+    return {
+        "customer": {"name": name, "email": f"{name.split()[0].lower()}@example.com", "street": "1 Main Street",
+                     "city": "Kyiv", "postal-code": "01001"},
+        "items": [{"id": str(meal_id), "quantity": 2} for meal_id in meal_ids],
+    }
+
+
+async def create_orders(client, meal_ids, count: int, name: str = 'Alice Smith') -> list[str]:
+    ids = []
+    for _ in range(count):
+        response = await client.post('/api/orders/', json=order_body(meal_ids, name))
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+    return ids
+
+
+async def test_get_order_by_id(client, meal_ids):
+    [order_id] = await create_orders(client, meal_ids, 1)
+
+    with assert_max_queries(GET_ORDER_QUERIES):
+        response = await client.get(f'/api/orders/{order_id}')
+
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == len(meal_ids)
+
+
+async def test_get_missing_order_by_id(client, meal_ids):
+    with assert_max_queries(1):
+        response = await client.get(f'/api/orders/{uuid4()}')
+
+    assert response.status_code == 404
+
+
+async def test_get_orders_by_customer_info(client, meal_ids):
+    await create_orders(client, meal_ids, 10)
+    await create_orders(client, meal_ids[:1], 3, name='Bob Jones')
+
+    with assert_max_queries(LIST_ORDERS_QUERIES):
+        response = await client.get('/api/orders/customer/alice', params={"limit": 5})
+
+    assert response.status_code == 200
+    orders = response.json()
+    assert len(orders) == 5
+    assert all(len(order["items"]) == len(meal_ids) for order in orders)
+    assert response.headers.get("X-Next-Cursor")
+
+    with assert_max_queries(LIST_ORDERS_QUERIES):
+        response = await client.get('/api/orders/customer/alice',
+                                    params={"limit": 5, "cursor": response.headers["X-Next-Cursor"]})
+
+    assert len(response.json()) == 5
+
+
+async def test_get_orders_by_meal(client, meal_ids):
+    await create_orders(client, meal_ids, 10)
+    await create_orders(client, meal_ids[1:], 3)
+
+    with assert_max_queries(LIST_ORDERS_QUERIES):
+        response = await client.get(f'/api/orders/meal/{meal_ids[0]}', params={"limit": 50})
+
+    assert response.status_code == 200
+    orders = response.json()
+    assert len(orders) == 10
+    assert all(len(order["items"]) == len(meal_ids) for order in orders)
+
+
+@pytest.mark.parametrize('items', [1, 5])
+async def test_create_order(client, meal_ids, items):
+    with assert_max_queries(CREATE_ORDER_QUERIES):
+        response = await client.post('/api/orders/', json=order_body(meal_ids[:items]))
+
+    assert response.status_code == 201
+    assert len(response.json()["items"]) == items
+
+
+@pytest.mark.parametrize('count', [1, 50])
+async def test_create_orders_bulk(client, meal_ids, count):
+    orders = [order_body(meal_ids[:1 + number % len(meal_ids)], name=f"Customer {number}")
+              for number in range(count)]
+    orders.append({"customer": {}, "items": []})
+
+    with assert_max_queries(BULK_ORDERS_QUERIES):
+        response = await client.post('/api/orders/bulk', json=orders)
+
+    assert response.status_code == 200
+    assert response.json()["created"] == count
+    assert response.json()["failed"] == 1
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from main import app
+from src.config.config import settings
+from src.database.models import OrderEvent
+from src.repository.outbox import ORDER_CREATED, record_order_events
+from src.services import outbox
+from src.services.outbox import OutboxDispatcher, RedisStreamSink, WebhookSink, make_sink
+
+pytestmark = pytest.mark.anyio
+
+STREAM = 'orders:events'
+
+
+class FailingSink:
+    def __init__(self):
+        self.calls = 0
+
+    async def send(self, events):
+        self.calls += 1
+        raise ConnectionError("consumer down")
+
+
+@pytest.fixture
+def redis(make_redis, monkeypatch):
+    client = make_redis()
+    monkeypatch.setattr(outbox, 'get_redis', lambda: client)
+    return client
+
+
+@pytest.fixture
+async def event_ids(db):
+    await record_order_events(db, [
+        {"event_type": ORDER_CREATED, "order_id": uuid4(), "payload": {"number": number}}
+        for number in range(3)
+    ])
+    await db.commit()
+    return list((await db.execute(select(OrderEvent.id).order_by(OrderEvent.id))).scalars().all())
+
+
+async def load_events(db) -> list:
+    """Events with their remaining backoff; ``now()`` is that of a new transaction."""
+    await db.rollback()
+    return list((await db.execute(
+        select(OrderEvent, OrderEvent.available_at - func.now())
+        .order_by(OrderEvent.id)
+        .execution_options(populate_existing=True)
+    )).all())
+
+
+async def test_dispatch_batch_adds_events_to_the_stream_and_marks_them_dispatched(db, redis, event_ids):
+    dispatcher = OutboxDispatcher(RedisStreamSink(STREAM, maxlen=1000), batch_size=10)
+
+    assert await dispatcher.dispatch_batch() == 3
+
+    entries = await redis.xrange(STREAM)
+    assert [int(fields[b'id']) for _, fields in entries] == event_ids
+    message = json.loads(entries[0][1][b'payload'])
+    assert message["type"] == ORDER_CREATED
+    assert message["data"] == {"number": 0}
+    assert all(event.dispatched_at is not None and event.attempts == 0 for event, _ in await load_events(db))
+    assert await dispatcher.dispatch_batch() == 0
+    assert await redis.xlen(STREAM) == 3
+
+
+async def test_dispatch_batch_sends_at_most_a_batch(db, redis, event_ids):
+    dispatcher = OutboxDispatcher(RedisStreamSink(STREAM, maxlen=1000), batch_size=2)
+
+    assert await dispatcher.dispatch_batch() == 2
+    assert await dispatcher.dispatch_batch() == 1
+    assert [int(fields[b'id']) for _, fields in await redis.xrange(STREAM)] == event_ids
+
+
+async def test_failed_batch_is_retried_after_a_backoff(db, event_ids, monkeypatch):
+    monkeypatch.setattr(settings, 'outbox_backoff_base', 60)
+    dispatcher = OutboxDispatcher(FailingSink(), batch_size=10)
+
+    assert await dispatcher.dispatch_batch() == 3
+
+    for event, delay in await load_events(db):
+        assert event.dispatched_at is None
+        assert event.attempts == 1
+        assert event.last_error == "ConnectionError: consumer down"
+        # backoff_base * 2 ** 0 seconds from the failed transaction.
+        assert 55 < delay.total_seconds() <= 60
+    assert await dispatcher.dispatch_batch() == 0
+
+    await db.execute(OrderEvent.__table__.update().values(available_at=func.now(), attempts=2))
+    await db.commit()
+    assert await dispatcher.dispatch_batch() == 3
+    for event, delay in await load_events(db):
+        assert event.attempts == 3
+        assert 235 < delay.total_seconds() <= 240
+
+
+async def test_backoff_is_capped(db, event_ids, monkeypatch):
+    monkeypatch.setattr(settings, 'outbox_backoff_base', 60)
+    monkeypatch.setattr(settings, 'outbox_backoff_max', 90)
+    await db.execute(OrderEvent.__table__.update().values(attempts=5))
+    await db.commit()
+
+    assert await OutboxDispatcher(FailingSink(), batch_size=10).dispatch_batch() == 3
+
+    assert all(85 < delay.total_seconds() <= 90 for _, delay in await load_events(db))
+
+
+async def test_dispatch_stops_after_max_attempts(db, event_ids, monkeypatch):
+    monkeypatch.setattr(settings, 'outbox_max_attempts', 3)
+    monkeypatch.setattr(settings, 'outbox_backoff_base', 0)
+    sink = FailingSink()
+    dispatcher = OutboxDispatcher(sink, batch_size=10)
+
+    for _ in range(3):
+        assert await dispatcher.dispatch_batch() == 3
+    assert await dispatcher.dispatch_batch() == 0
+
+    assert sink.calls == 3
+    for event, _ in await load_events(db):
+        assert event.attempts == 3
+        assert event.dispatched_at is None
+        assert event.last_error == "ConnectionError: consumer down"
+
+
+def test_make_sink(monkeypatch):
+    monkeypatch.setattr(settings, 'outbox_sink', 'redis')
+    assert isinstance(make_sink(), RedisStreamSink)
+
+    monkeypatch.setattr(settings, 'outbox_sink', 'webhook')
+    monkeypatch.setattr(settings, 'outbox_webhook_url', None)
+    with pytest.raises(ValueError, match="OUTBOX_WEBHOOK_URL"):
+        make_sink()
+    monkeypatch.setattr(settings, 'outbox_webhook_url', 'http://consumer.test/events')
+    assert isinstance(make_sink(), WebhookSink)
+
+    monkeypatch.setattr(settings, 'outbox_sink', 'kafka')
+    with pytest.raises(ValueError, match="kafka"):
+        make_sink()
+
+
+def test_misconfigured_sink_fails_startup(monkeypatch):
+    monkeypatch.setattr(settings, 'outbox_enabled', True)
+    monkeypatch.setattr(settings, 'outbox_sink', 'webhook')
+    monkeypatch.setattr(settings, 'outbox_webhook_url', None)
+
+    with pytest.raises(ValueError, match="OUTBOX_WEBHOOK_URL"):
+        with TestClient(app):
+            pass
+
+
+async def test_run_logs_failed_batches_and_keeps_going(monkeypatch, caplog):
+    dispatcher = OutboxDispatcher(FailingSink(), batch_size=10)
+    calls = 0
+
+    async def broken_batch():
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(dispatcher, 'dispatch_batch', broken_batch)
+    with caplog.at_level(logging.ERROR, logger=outbox.__name__):
+        task = asyncio.create_task(dispatcher.run(poll_interval=0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    assert calls > 1
+    assert any(record.exc_info and "database down" in str(record.exc_info[1]) for record in caplog.records)
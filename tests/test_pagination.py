@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from src.services.pagination import CREATED_AT_ID, decode_cursor, encode_cursor
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    created_at, id = datetime(2024, 1, 1, 12, 30), uuid4()
+
+    assert decode_cursor(encode_cursor(created_at, id), *CREATED_AT_ID) == [created_at, id]
+    assert decode_cursor(encode_cursor(0.5, created_at, id), float, *CREATED_AT_ID) == [0.5, created_at, id]
+
+
+@pytest.mark.parametrize('cursor', [
+    raw_cursor(["2024-01-01T00:00:00", 5]),
+    raw_cursor(["2024-01-01T00:00:00", None]),
+    raw_cursor([5, str(uuid4())]),
+    raw_cursor([["2024-01-01T00:00:00"], str(uuid4())]),
+    raw_cursor(["2024-01-01T00:00:00", {"hex": "0" * 32}]),
+    raw_cursor([True, str(uuid4())]),
+    raw_cursor(["yesterday", str(uuid4())]),
+    raw_cursor(["2024-01-01T00:00:00"]),
+    raw_cursor({"created_at": "2024-01-01T00:00:00"}),
+    base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+    'not base64 at all!',
+    '',
+])
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, *CREATED_AT_ID)
+
+    assert error.value.status_code == 400
+
+
+def test_tampered_rank_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(raw_cursor([[1], "2024-01-01T00:00:00", str(uuid4())]), float, *CREATED_AT_ID)
+
+    assert error.value.status_code == 400
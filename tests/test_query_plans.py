@@ -0,0 +1,28 @@
+"""Every repository query can use an index on the tables that grow with orders.
+
+The same audit as ``python -m benchmarks.explain``, on a small seeded database:
+plans are made without sequential scans, hash and merge joins, so a full scan
+left in a plan means that no index serves the statement. The menu tables stay small and are
+read whole on purpose (``get_image_paths``), so they are not checked.
+"""
+import pytest
+
+from benchmarks.explain import audit_repository
+from benchmarks.seed import seed
+from src.database.models import DailySales, MealDailyStats, Order, OrderEvent, order_meals
+from src.services.cache import menu_cache
+
+pytestmark = pytest.mark.anyio
+
+ORDER_TABLES = {Order.__tablename__, order_meals.name, MealDailyStats.__tablename__, DailySales.__tablename__,
+                OrderEvent.__tablename__}
+
+
+async def test_repository_queries_use_indexes(db, monkeypatch):
+    # audit_repository turns the menu cache off; it is back on for the next tests.
+    monkeypatch.setattr(menu_cache, 'enabled', False)
+    await seed(meals=20, orders=200)
+
+    problems = await audit_repository(min_rows=-1, force_index_scans=True, tables=ORDER_TABLES)
+
+    assert not problems, "\n".join(problems)
@@ -0,0 +1,54 @@
+import json
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from fastapi.responses import JSONResponse
+
+from src.config.config import Settings, settings
+from src.schemas.orders import OrderMealOut, OrderOut, OrderOutCustomer, order_adapter, order_list_adapter
+from src.services.serialization import json_response
+
+
+def make_order() -> OrderOut:
+    return OrderOut.model_construct(
+        id=uuid4(),
+        customer=OrderOutCustomer.model_construct(name="Alice Smith", email="alice@example.com",
+                                                  street="1 Main Street", city="Kyiv", postal_code="01001"),
+        items=[OrderMealOut.model_construct(id=uuid4(), name="Borscht", price=12.5, description=None,
+                                            image=None, quantity=2)],
+        total=25.0,
+        created_at=datetime(2024, 1, 1, 12, 30),
+        updated_at=datetime(2024, 1, 1, 12, 30),
+    )
+
+
+def test_fast_json_is_opt_in():
+    assert Settings.model_fields['fast_json'].default is False
+
+
+@pytest.mark.parametrize('fast_json', [False, True])
+def test_json_response_modes_send_the_same_document(monkeypatch, fast_json):
+    monkeypatch.setattr(settings, 'fast_json', fast_json)
+    order = make_order()
+
+    response = json_response(order_adapter, order, status_code=201, headers={"ETag": '"v1"'})
+
+    assert isinstance(response, JSONResponse) is not fast_json
+    assert response.status_code == 201
+    assert response.media_type == "application/json"
+    assert response.headers["ETag"] == '"v1"'
+    body = json.loads(response.body)
+    assert body == json.loads(order_adapter.dump_json(order, by_alias=True))
+    assert body["customer"]["postal-code"] == "01001"
+    assert body["created_at"] == "2024-01-01T12:30:00"
+
+
+@pytest.mark.parametrize('fast_json', [False, True])
+def test_json_response_lists(monkeypatch, fast_json):
+    monkeypatch.setattr(settings, 'fast_json', fast_json)
+    orders = [make_order(), make_order()]
+
+    response = json_response(order_list_adapter, orders)
+
+    assert [order["id"] for order in json.loads(response.body)] == [str(order.id) for order in orders]
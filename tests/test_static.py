@@ -0,0 +1,66 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.services.static import ImmutableStaticFiles, accepted_encodings, precompress
+
+CSS = b"body { color: #333; }\n" * 100
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / 'app.css').write_bytes(CSS)
+    (tmp_path / 'app.css.br').write_bytes(b'brotli bytes')
+    (tmp_path / 'app.css.gz').write_bytes(gzip.compress(CSS))
+    return tmp_path
+
+
+@pytest.fixture
+def client(static_dir):
+    app = FastAPI()
+    app.mount("/static", ImmutableStaticFiles(directory=static_dir), name="static")
+    return TestClient(app)
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br;q=0") == {"gzip": 1.0, "deflate": 1.0, "br": 0.0}
+    assert accepted_encodings(" BR ; q=0.5 ,gzip;q=0.8, *;q=0.1") == {"br": 0.5, "gzip": 0.8, "*": 0.1}
+    assert accepted_encodings("gzip;q=high") == {"gzip": 0.0}
+    assert accepted_encodings("") == {}
+
+
+@pytest.mark.parametrize('accept_encoding, content_encoding', [
+    ("gzip, deflate, br", "br"),
+    ("gzip, br;q=0", "gzip"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("*", "br"),
+    ("*;q=0.5, br;q=0", "gzip"),
+    ("gzip;q=0, br;q=0", None),
+    ("identity", None),
+])
+def test_precompressed_file_follows_accept_encoding(client, accept_encoding, content_encoding):
+    # Streamed, so the client does not try to decode the fake brotli body.
+    with client.stream("GET", "/static/app.css", headers={"Accept-Encoding": accept_encoding}) as response:
+        assert response.status_code == 200
+        assert response.headers.get("content-encoding") == content_encoding
+        assert response.headers["content-type"].startswith("text/css")
+        assert response.headers["vary"] == "Accept-Encoding"
+        if content_encoding is None:
+            assert response.read() == CSS
+
+
+def test_precompress_writes_smaller_gzip_siblings(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'app.css').write_bytes(CSS)
+    (tmp_path / 'tiny.txt').write_bytes(b'hi')
+    (tmp_path / 'photo.jpg').write_bytes(b'\xff\xd8' + b'\0' * 1000)
+
+    assert precompress(str(tmp_path)) >= 1
+
+    assert gzip.decompress((tmp_path / 'css' / 'app.css.gz').read_bytes()) == CSS
+    assert not (tmp_path / 'tiny.txt.gz').exists()
+    assert not (tmp_path / 'photo.jpg.gz').exists()
+    assert not (tmp_path / 'css' / 'app.css.gz.gz').exists()
+    assert precompress(str(tmp_path)) == 0
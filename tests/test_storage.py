@@ -0,0 +1,165 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from src.config.config import settings
+from src.services.storage import DirectUploadUnsupported, LocalStorage, S3Storage, Storage
+
+pytestmark = pytest.mark.anyio
+
+PART_SIZE = 5 * 1024 * 1024  # the smallest part S3 accepts
+
+
+@pytest.fixture(scope='module')
+def s3_endpoint():
+    moto_server = pytest.importorskip('moto.server')
+    server = moto_server.ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+async def s3_storage(s3_endpoint, monkeypatch):
+    monkeypatch.setattr(settings, 's3_endpoint_url', s3_endpoint)
+    monkeypatch.setattr(settings, 's3_access_key', 'testing')
+    monkeypatch.setattr(settings, 's3_secret_key', 'testing')
+    monkeypatch.setattr(settings, 's3_part_size', PART_SIZE)
+    storage = S3Storage()
+    client = await storage.client()
+    await client.create_bucket(Bucket=storage.bucket)
+    yield storage
+    async for stored in storage.list(''):
+        await storage.delete(stored.path)
+    await client.delete_bucket(Bucket=storage.bucket)
+    await storage.close()
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    return LocalStorage(str(tmp_path / 'static'))
+
+
+def write_file(path, size: int) -> bytes:
+    data = os.urandom(size)
+    path.write_bytes(data)
+    return data
+
+
+async def test_s3_save_small_file_in_one_request(s3_storage, tmp_path):
+    data = write_file(tmp_path / 'small.jpg', 1024)
+
+    await s3_storage.save_file('images/ab/small.jpg', str(tmp_path / 'small.jpg'), 'image/jpeg',
+                               'public, max-age=31536000, immutable')
+
+    client = await s3_storage.client()
+    head = await client.head_object(Bucket=s3_storage.bucket, Key='images/ab/small.jpg')
+    assert head['ContentLength'] == len(data)
+    assert head['ContentType'] == 'image/jpeg'
+    assert head['CacheControl'] == 'public, max-age=31536000, immutable'
+    assert 'PartsCount' not in head
+
+
+async def test_s3_save_large_file_as_multipart_upload(s3_storage, tmp_path):
+    data = write_file(tmp_path / 'large.jpg', 2 * PART_SIZE + 1024)
+
+    await s3_storage.save_file('images/ab/large.jpg', str(tmp_path / 'large.jpg'), 'image/jpeg')
+
+    client = await s3_storage.client()
+    part = await client.head_object(Bucket=s3_storage.bucket, Key='images/ab/large.jpg', PartNumber=1)
+    assert part['PartsCount'] == 3
+    head = await client.head_object(Bucket=s3_storage.bucket, Key='images/ab/large.jpg')
+    assert head['ContentType'] == 'image/jpeg'
+    await s3_storage.download('images/ab/large.jpg', str(tmp_path / 'copy.jpg'))
+    assert (tmp_path / 'copy.jpg').read_bytes() == data
+    uploads = await client.list_multipart_uploads(Bucket=s3_storage.bucket)
+    assert not uploads.get('Uploads')
+
+
+async def test_s3_stat_touch_list_and_delete(s3_storage, tmp_path):
+    write_file(tmp_path / 'image.jpg', 2048)
+    await s3_storage.save_file('images/ab/image.jpg', str(tmp_path / 'image.jpg'), 'image/jpeg', 'no-cache')
+    await s3_storage.save_file('images/cd/other.jpg', str(tmp_path / 'image.jpg'), 'image/jpeg')
+
+    stored = await s3_storage.stat('images/ab/image.jpg')
+    assert stored.path == 'images/ab/image.jpg'
+    assert stored.size == 2048
+    assert [item.path async for item in s3_storage.list('images/ab/')] == ['images/ab/image.jpg']
+
+    await asyncio.sleep(1.1)  # LastModified has a resolution of one second
+    await s3_storage.touch('images/ab/image.jpg')
+    touched = await s3_storage.stat('images/ab/image.jpg')
+    assert touched.modified > stored.modified
+    client = await s3_storage.client()
+    head = await client.head_object(Bucket=s3_storage.bucket, Key='images/ab/image.jpg')
+    assert head['ContentType'] == 'image/jpeg'
+    assert head['CacheControl'] == 'no-cache'
+
+    await s3_storage.delete('images/ab/image.jpg')
+    assert await s3_storage.stat('images/ab/image.jpg') is None
+    assert [item.path async for item in s3_storage.list('images/')] == ['images/cd/other.jpg']
+    await s3_storage.delete('images/ab/image.jpg')
+
+
+async def test_s3_presigned_upload_accepts_a_browser_post(s3_storage):
+    presigned = await s3_storage.presigned_upload('uploads/new.jpg', 'image/jpeg', max_size=1024, expires_in=60)
+
+    assert presigned['fields']['key'] == 'uploads/new.jpg'
+    assert presigned['fields']['Content-Type'] == 'image/jpeg'
+    async with httpx.AsyncClient() as http:
+        response = await http.post(presigned['url'], data=presigned['fields'],
+                                   files={'file': ('new.jpg', b'jpeg bytes', 'image/jpeg')})
+    assert response.status_code == 204
+    stored = await s3_storage.stat('uploads/new.jpg')
+    assert stored.size == len(b'jpeg bytes')
+
+
+async def test_local_save_stat_touch_list_and_delete(local_storage, tmp_path):
+    data = write_file(tmp_path / 'image.jpg', 2048)
+
+    await local_storage.save_file('images/ab/image.jpg', str(tmp_path / 'image.jpg'), 'image/jpeg')
+    await local_storage.save_file('images/cd/other.jpg', str(tmp_path / 'image.jpg'), 'image/jpeg')
+
+    assert (local_storage.root / 'images/ab/image.jpg').read_bytes() == data
+    assert not [path for path in local_storage.root.rglob('*.tmp')]
+    stored = await local_storage.stat('images/ab/image.jpg')
+    assert stored.path == 'images/ab/image.jpg'
+    assert stored.size == 2048
+    assert [item.path async for item in local_storage.list('images/ab')] == ['images/ab/image.jpg']
+
+    os.utime(local_storage.root / 'images/ab/image.jpg', (stored.modified - 60, stored.modified - 60))
+    await local_storage.touch('images/ab/image.jpg')
+    assert (await local_storage.stat('images/ab/image.jpg')).modified > stored.modified - 60
+
+    await local_storage.download('images/ab/image.jpg', str(tmp_path / 'copy.jpg'))
+    assert (tmp_path / 'copy.jpg').read_bytes() == data
+
+    await local_storage.delete('images/ab/image.jpg')
+    assert await local_storage.stat('images/ab/image.jpg') is None
+    assert [item.path async for item in local_storage.list('images')] == ['images/cd/other.jpg']
+    await local_storage.delete('images/ab/image.jpg')
+
+
+async def test_local_save_replaces_an_existing_file(local_storage, tmp_path):
+    write_file(tmp_path / 'first.jpg', 100)
+    second = write_file(tmp_path / 'second.jpg', 200)
+
+    await local_storage.save_file('images/ab/image.jpg', str(tmp_path / 'first.jpg'))
+    await local_storage.save_file('images/ab/image.jpg', str(tmp_path / 'second.jpg'))
+
+    assert (local_storage.root / 'images/ab/image.jpg').read_bytes() == second
+
+
+def test_storage_backends_implement_every_method():
+    with pytest.raises(TypeError):
+        Storage()
+    assert S3Storage.supports_direct_upload
+    assert not LocalStorage.supports_direct_upload
+
+
+async def test_local_presigned_upload_is_not_supported(local_storage):
+    with pytest.raises(DirectUploadUnsupported):
+        await local_storage.presigned_upload('uploads/new.jpg', 'image/jpeg', 1024, 60)